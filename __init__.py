@@ -1,37 +1,165 @@
+import asyncio
 import logging
+import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from .const import DOMAIN
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.storage import Store
+from homeassistant.util import slugify
+from .const import CONF_HOSTS, CONF_READ_CACHE_TTL, DEFAULT_READ_CACHE_TTL, DOMAIN, STORAGE_VERSION
 from .cres_control import CresControl
+from .cres_req import CresSession
+from .cres_profile import validate_profile
+from .cres_query import is_error_value
+from .scheduler import DATA_SCHEDULER, async_get_scheduler
 from .coordinator import ExampleCoordinator
 
 _LOGGER = logging.getLogger(__name__)
 
+SERVICE_APPLY_PROFILE = "apply_profile"
+
+APPLY_PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional("config_entry_id"): cv.string,
+        vol.Optional("host"): cv.string,
+        vol.Required("profile"): vol.Schema({cv.string: vol.Any(bool, int, float, str)}),
+    }
+)
+
 
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     """Set up the CresControl integration."""
     _LOGGER.debug("Initialisiere CresControl Integration")
+
+    async def async_apply_profile(call: ServiceCall):
+        return await _async_apply_profile(hass, call)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_APPLY_PROFILE,
+        async_apply_profile,
+        schema=APPLY_PROFILE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
     return True
 
 
+def _service_entry_data(hass: HomeAssistant, entry_id):
+    """Return the data of the addressed entry, or the only one if none is given."""
+    entries = hass.data.get(DOMAIN, {})
+    if entry_id is not None:
+        if entry_id not in entries:
+            raise ServiceValidationError(f"CresControl entry {entry_id} is not loaded")
+        return entries[entry_id]
+    if len(entries) != 1:
+        raise ServiceValidationError(
+            f"{len(entries)} CresControl entries are loaded, pass config_entry_id"
+        )
+    return next(iter(entries.values()))
+
+
+def _service_coordinator(hass: HomeAssistant, entry_id, host):
+    """Return the coordinator of the addressed controller of an entry."""
+    coordinators = _service_entry_data(hass, entry_id)["coordinators"]
+    if host is not None:
+        if host not in coordinators:
+            raise ServiceValidationError(f"CresControl {host} is not loaded")
+        coordinator = coordinators[host]
+    elif len(coordinators) != 1:
+        raise ServiceValidationError(
+            f"The entry manages {len(coordinators)} CresControl units, pass host"
+        )
+    else:
+        coordinator = next(iter(coordinators.values()))
+    if coordinator.pending_setup:
+        raise ServiceValidationError(f"CresControl {coordinator.host} has not answered since setup")
+    return coordinator
+
+
+async def _async_apply_profile(hass: HomeAssistant, call: ServiceCall):
+    """Write a mapping of device keys to values in as few commands as possible.
+
+    Nothing is written if a key fails validation. The response holds the
+    result of every key: ok, rejected, unconfirmed, failed, invalid or
+    skipped.
+    """
+    coordinator = _service_coordinator(
+        hass, call.data.get("config_entry_id"), call.data.get("host")
+    )
+    profile = call.data["profile"]
+    writes, errors = validate_profile(coordinator.controller, profile)
+    if errors:
+        _LOGGER.warning(f"Profil nicht angewendet, ungültige Werte: {errors}")
+        return {
+            "results": {
+                key: {"status": "invalid", "error": errors[key]}
+                if key in errors
+                else {"status": "skipped", "value": writes[key]}
+                for key in profile
+            }
+        }
+
+    try:
+        answers = await coordinator.async_write_many(writes, debounce=False)
+    except Exception as e:
+        _LOGGER.error(f"Profil konnte nicht angewendet werden: {e}")
+        return {
+            "results": {
+                key: {"status": "failed", "value": value, "error": str(e)}
+                for key, value in writes.items()
+            }
+        }
+
+    results = {}
+    for key, value in writes.items():
+        answer = answers.get(key)
+        if answer is None:
+            results[key] = {"status": "unconfirmed", "value": value}
+        elif is_error_value(answer):
+            results[key] = {"status": "rejected", "value": value, "error": answer}
+        else:
+            results[key] = {"status": "ok", "value": value, "answer": answer}
+    return {"results": results}
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     _LOGGER.debug("Setup der Konfigurationseinträge gestartet")
 
-    host = entry.data["host"]
-    control = CresControl(host)
+    hosts = _entry_hosts(entry)
+    fleet = CONF_HOSTS in entry.data
+    # The controllers of a fleet share one keep-alive pool
+    session = CresSession() if fleet else None
 
-    if not await control.test_connection():
-        _LOGGER.error(f"Verbindungstest zu {host} fehlgeschlagen.")
-        return False
+    results = await asyncio.gather(
+        *(_async_setup_controller(hass, entry, host, session, fleet) for host in hosts),
+        return_exceptions=True,
+    )
+    coordinators = {}
+    for host, result in zip(hosts, results):
+        if isinstance(result, BaseException):
+            if not fleet:
+                raise result
+            _LOGGER.error(f"Einrichtung von {host} fehlgeschlagen: {result}")
+        elif result is not None:
+            coordinators[host] = result
 
-    coordinator = ExampleCoordinator(hass, entry, control)
+    if not coordinators:
+        if session is not None:
+            await session.close()
+        return False
 
     hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
-        "control": control,
-        "coordinator": coordinator,
+        "coordinators": coordinators,
+        "session": session,
     }
 
-    await coordinator.async_config_entry_first_refresh()
+    # Polls of all entries are spread over the interval by one scheduler
+    scheduler = async_get_scheduler(hass)
+    for coordinator in coordinators.values():
+        scheduler.add(coordinator)
+
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
 
     platforms = ["fan", "sensor", "switch", "number"]
     for platform in platforms:
@@ -40,10 +168,148 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         )
         _LOGGER.debug(f"Plattform {platform} wird geladen")
 
-    _LOGGER.debug("CresControl Integration erfolgreich eingerichtet")
+    ready = sum(not coordinator.pending_setup for coordinator in coordinators.values())
+    _LOGGER.debug(f"CresControl Integration mit {ready} von {len(hosts)} Controllern eingerichtet")
     return True
 
 
+def _entry_hosts(entry: ConfigEntry):
+    """Hosts of an entry: one for a single controller, several for a fleet."""
+    return entry.data.get(CONF_HOSTS) or [entry.data["host"]]
+
+
+def _unit_id(entry: ConfigEntry, host):
+    """Tell the controllers of a fleet apart, None for a single controller."""
+    return slugify(host) if CONF_HOSTS in entry.data else None
+
+
+async def _async_setup_controller(
+    hass: HomeAssistant, entry: ConfigEntry, host, session, fleet
+) -> ExampleCoordinator | None:
+    """Set up the controller and coordinator of one host.
+
+    A single controller that is unreachable returns None. The coordinator of
+    an unreachable fleet unit is kept, pending until its first good poll.
+    """
+    control = CresControl(
+        host,
+        session,
+        cache_ttl=entry.options.get(CONF_READ_CACHE_TTL, DEFAULT_READ_CACHE_TTL),
+        limiter=async_get_scheduler(hass).limiter,
+    )
+    unit_id = _unit_id(entry, host)
+
+    snapshot_store = _snapshot_store(hass, entry, unit_id)
+    snapshot = await snapshot_store.async_load()
+    coordinator = ExampleCoordinator(hass, entry, control, snapshot_store, unit_id)
+
+    if snapshot:
+        # Entities come up from the last snapshot right away, the controller
+        # is asked in the background
+        coordinator.async_restore_snapshot(snapshot)
+        await _async_load_capabilities(hass, entry, control, unit_id)
+        entry.async_create_background_task(
+            hass, _async_warm_start(hass, entry, control, coordinator), f"{DOMAIN} warm start {host}"
+        )
+        return coordinator
+
+    if fleet:
+        try:
+            await _async_first_poll(hass, entry, control, coordinator, unit_id)
+        except Exception as e:
+            # The unit stays in the fleet and is retried with every poll
+            _LOGGER.error(f"Einrichtung von {host} fehlgeschlagen, neuer Versuch bei der nächsten Abfrage: {e}")
+            coordinator.pending_setup = True
+        return coordinator
+
+    if not await control.test_connection():
+        _LOGGER.error(f"Verbindungstest zu {host} fehlgeschlagen.")
+        await control.close()
+        return None
+
+    await _async_setup_capabilities(hass, entry, control, unit_id)
+
+    try:
+        await coordinator.async_config_entry_first_refresh()
+    except Exception:
+        await control.close()
+        raise
+    return coordinator
+
+
+async def _async_first_poll(
+    hass: HomeAssistant, entry: ConfigEntry, control: CresControl, coordinator: ExampleCoordinator, unit_id
+) -> None:
+    """Test the connection, set up the capabilities and poll once, raising on failure."""
+    if not await control.test_connection():
+        raise ConnectionError("Verbindungstest fehlgeschlagen")
+    await _async_setup_capabilities(hass, entry, control, unit_id)
+    await coordinator.async_refresh()
+    if not coordinator.last_update_success:
+        raise coordinator.last_exception
+
+
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the entry so changed poll intervals take effect."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
+def _capability_store(hass: HomeAssistant, entry: ConfigEntry, unit_id=None) -> Store:
+    return Store(hass, STORAGE_VERSION, _storage_key(entry, unit_id, "capabilities"))
+
+
+def _snapshot_store(hass: HomeAssistant, entry: ConfigEntry, unit_id=None) -> Store:
+    return Store(hass, STORAGE_VERSION, _storage_key(entry, unit_id, "snapshot"))
+
+
+def _storage_key(entry: ConfigEntry, unit_id, name):
+    if unit_id is None:
+        return f"{DOMAIN}.{entry.entry_id}.{name}"
+    return f"{DOMAIN}.{entry.entry_id}.{unit_id}.{name}"
+
+
+async def _async_load_capabilities(
+    hass: HomeAssistant, entry: ConfigEntry, control: CresControl, unit_id=None
+) -> bool:
+    """Restore the capabilities probed for this firmware, False if there are none."""
+    stored = await _capability_store(hass, entry, unit_id).async_load() or {}
+    if stored.get("type") != control.firmware_type:
+        return False
+    control.capabilities.load(stored.get("capabilities", {}))
+    return True
+
+
+async def _async_setup_capabilities(
+    hass: HomeAssistant, entry: ConfigEntry, control: CresControl, unit_id=None
+) -> None:
+    """Restore the capabilities probed for this firmware, or probe them once."""
+    await _async_load_capabilities(hass, entry, control, unit_id)
+
+    try:
+        probed = await control.probe_capabilities()
+    except Exception as err:
+        _LOGGER.warning(f"Prüfung der Fähigkeiten von {control.reqAddr} fehlgeschlagen: {err}")
+        return
+
+    if probed:
+        await _capability_store(hass, entry, unit_id).async_save(
+            {"type": control.firmware_type, "capabilities": control.capabilities.as_dict()}
+        )
+
+
+async def _async_warm_start(
+    hass: HomeAssistant, entry: ConfigEntry, control: CresControl, coordinator: ExampleCoordinator
+) -> None:
+    """Replace the snapshot a controller was restored from by live data."""
+    if await control.test_connection():
+        # Capabilities stored for the firmware the controller reports need no probe
+        if not await _async_load_capabilities(hass, entry, control, coordinator.unit_id):
+            await _async_setup_capabilities(hass, entry, control, coordinator.unit_id)
+    else:
+        _LOGGER.warning(f"{control.reqAddr} nicht erreichbar, zeige Werte aus dem Snapshot")
+    await coordinator.async_refresh()
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Handle unloading of an entry."""
     _LOGGER.debug("Entladen der Konfigurationseinträge gestartet")
@@ -52,9 +318,32 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, platforms)
 
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        entry_data = hass.data[DOMAIN].pop(entry.entry_id)
+        scheduler = async_get_scheduler(hass)
+        coordinators = entry_data["coordinators"].values()
+        for coordinator in coordinators:
+            scheduler.remove(coordinator)
+        if not len(scheduler):
+            hass.data.pop(DATA_SCHEDULER)
+        await asyncio.gather(*(_async_unload_controller(coordinator) for coordinator in coordinators))
+        if entry_data["session"] is not None:
+            await entry_data["session"].close()
         _LOGGER.debug("CresControl Integration erfolgreich entladen")
     else:
         _LOGGER.error("Fehler beim Entladen der CresControl Integration")
 
     return unload_ok
+
+
+async def _async_unload_controller(coordinator: ExampleCoordinator) -> None:
+    await coordinator.writes.close()
+    await coordinator.async_save_snapshot()
+    await coordinator.controller.close()
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove persisted data of a deleted entry."""
+    for host in _entry_hosts(entry):
+        unit_id = _unit_id(entry, host)
+        await _capability_store(hass, entry, unit_id).async_remove()
+        await _snapshot_store(hass, entry, unit_id).async_remove()
@@ -1,17 +1,80 @@
+import asyncio
+import ipaddress
+import re
 import voluptuous as vol
 from homeassistant import config_entries
-from homeassistant.const import CONF_HOST
+from homeassistant.const import CONF_HOST, CONF_SCAN_INTERVAL
 from homeassistant.core import callback
-from .const import DOMAIN
+from .const import (
+    CONF_HOSTS,
+    CONF_PUBLISH_DEADBAND,
+    CONF_PUBLISH_MAX_SILENCE,
+    CONF_READ_CACHE_TTL,
+    CONF_SLOW_SCAN_INTERVAL,
+    CONF_STALE_GRACE_PERIOD,
+    DEFAULT_PUBLISH_MAX_SILENCE,
+    DEFAULT_READ_CACHE_TTL,
+    DEFAULT_SCAN_INTERVAL,
+    DEFAULT_SLOW_SCAN_INTERVAL,
+    DEFAULT_STALE_GRACE_PERIOD,
+    DOMAIN,
+    MAX_FLEET_SIZE,
+    MIN_SCAN_INTERVAL,
+)
 from .cres_control import CresControl  # Stellen Sie sicher, dass CresControl importiert wird
+from .cres_req import CresSession
 import logging
 
 _LOGGER = logging.getLogger(__name__)
 
+
+def parse_hosts(text):
+    """Parse hosts separated by commas or whitespace.
+
+    IPv4 ranges are expanded, both "10.0.0.10-10.0.0.40" and "10.0.0.10-40".
+    Raises ValueError for malformed ranges or more than MAX_FLEET_SIZE hosts.
+    """
+    hosts = []
+    for part in re.split(r"[,;\s]+", text.strip()):
+        if not part:
+            continue
+        start, sep, end = part.partition("-")
+        if not sep:
+            hosts.append(part)
+            continue
+        first = ipaddress.IPv4Address(start)
+        if "." not in end:
+            end = f"{start.rsplit('.', 1)[0]}.{end}"
+        last = ipaddress.IPv4Address(end)
+        if last < first or int(last) - int(first) >= MAX_FLEET_SIZE:
+            raise ValueError(f"Invalid range {part}")
+        hosts.extend(str(ipaddress.IPv4Address(a)) for a in range(int(first), int(last) + 1))
+
+    # Keep the order the hosts were given in
+    hosts = list(dict.fromkeys(hosts))
+    if not hosts or len(hosts) > MAX_FLEET_SIZE:
+        raise ValueError(f"Expected 1 to {MAX_FLEET_SIZE} hosts, got {len(hosts)}")
+    return hosts
+
+
+async def _async_test_host(host, session=None):
+    control = CresControl(host, session)
+    try:
+        return await control.test_connection()
+    except Exception as e:
+        _LOGGER.error(f"Failed to connect to {host}: {e}")
+        return False
+    finally:
+        await control.close()
+
+
 class CresControlConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
 
     async def async_step_user(self, user_input=None):
+        return self.async_show_menu(step_id="user", menu_options=["host", "fleet"])
+
+    async def async_step_host(self, user_input=None):
         errors = {}
 
         if user_input is None:
@@ -19,7 +82,7 @@ class CresControlConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 vol.Required(CONF_HOST): str
             })
             return self.async_show_form(
-                step_id="user",
+                step_id="host",
                 data_schema=schema,
                 errors=errors,
                 description_placeholders={
@@ -32,7 +95,10 @@ class CresControlConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         try:
             control = CresControl(host)  # Instanziieren der CresControl mit dem Host
-            connection_successful = await control.test_connection()  # Verwenden von CresControl zum Testen der Verbindung
+            try:
+                connection_successful = await control.test_connection()  # Verwenden von CresControl zum Testen der Verbindung
+            finally:
+                await control.close()
 
             if not connection_successful:
                 raise Exception("Connection test failed.")
@@ -42,7 +108,7 @@ class CresControlConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             _LOGGER.error(f"Failed to connect to {host}: {e}")
             errors["base"] = "cannot_connect"
             return self.async_show_form(
-                step_id="user",
+                step_id="host",
                 data_schema=vol.Schema({
                     vol.Required(CONF_HOST): str
                 }),
@@ -54,6 +120,56 @@ class CresControlConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         return self.async_create_entry(title=f"CresControl ({host})", data={"host": host})
 
+    async def async_step_fleet(self, user_input=None):
+        errors = {}
+        placeholders = {"hosts": "10.1.1.120-10.1.1.140, 10.1.2.5", "failed": ""}
+        schema = vol.Schema({
+            vol.Required(
+                CONF_HOSTS, default=(user_input or {}).get(CONF_HOSTS, "")
+            ): str
+        })
+
+        if user_input is None:
+            return self.async_show_form(
+                step_id="fleet",
+                data_schema=schema,
+                errors=errors,
+                description_placeholders=placeholders,
+            )
+
+        try:
+            hosts = parse_hosts(user_input[CONF_HOSTS])
+        except ValueError as e:
+            _LOGGER.error(f"Invalid fleet hosts: {e}")
+            errors["base"] = "invalid_hosts"
+        else:
+            _LOGGER.debug(f"Testing connection to {len(hosts)} hosts.")
+            # One pool for all tests, the hosts are asked concurrently
+            session = CresSession()
+            try:
+                results = await asyncio.gather(
+                    *(_async_test_host(host, session) for host in hosts)
+                )
+            finally:
+                await session.close()
+
+            failed = [host for host, ok in zip(hosts, results) if not ok]
+            if failed:
+                errors["base"] = "cannot_connect_hosts"
+                placeholders["failed"] = ", ".join(failed)
+
+        if errors:
+            return self.async_show_form(
+                step_id="fleet",
+                data_schema=schema,
+                errors=errors,
+                description_placeholders=placeholders,
+            )
+
+        return self.async_create_entry(
+            title=f"CresControl Fleet ({len(hosts)})", data={CONF_HOSTS: hosts}
+        )
+
     @staticmethod
     @callback
     def async_get_options_flow(config_entry):
@@ -65,10 +181,34 @@ class CresControlOptionsFlowHandler(config_entries.OptionsFlow):
 
     async def async_step_init(self, user_input=None):
         if user_input is None:
+            options = self.config_entry.options
             return self.async_show_form(
                 step_id="init",
                 data_schema=vol.Schema({
-               
+                    vol.Optional(
+                        CONF_SCAN_INTERVAL,
+                        default=options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=MIN_SCAN_INTERVAL)),
+                    vol.Optional(
+                        CONF_SLOW_SCAN_INTERVAL,
+                        default=options.get(CONF_SLOW_SCAN_INTERVAL, DEFAULT_SLOW_SCAN_INTERVAL),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=MIN_SCAN_INTERVAL)),
+                    vol.Optional(
+                        CONF_PUBLISH_DEADBAND,
+                        default=options.get(CONF_PUBLISH_DEADBAND, True),
+                    ): bool,
+                    vol.Optional(
+                        CONF_PUBLISH_MAX_SILENCE,
+                        default=options.get(CONF_PUBLISH_MAX_SILENCE, DEFAULT_PUBLISH_MAX_SILENCE),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=MIN_SCAN_INTERVAL)),
+                    vol.Optional(
+                        CONF_READ_CACHE_TTL,
+                        default=options.get(CONF_READ_CACHE_TTL, DEFAULT_READ_CACHE_TTL),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0, max=MIN_SCAN_INTERVAL)),
+                    vol.Optional(
+                        CONF_STALE_GRACE_PERIOD,
+                        default=options.get(CONF_STALE_GRACE_PERIOD, DEFAULT_STALE_GRACE_PERIOD),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0)),
                 })
             )
         return self.async_create_entry(title="", data=user_input)
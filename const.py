@@ -2,6 +2,88 @@
 
 DOMAIN = "crescontrol"
 
+# Fleet entries list the hosts of several controllers instead of one host
+CONF_HOSTS = "hosts"
+
+# Longest list of hosts a fleet entry accepts, e.g. from a mistyped range
+MAX_FLEET_SIZE = 256
+
 DEFAULT_SCAN_INTERVAL = 5
 
 MIN_SCAN_INTERVAL = 5
+
+# Calibration and configuration keys are polled on this slower interval
+CONF_SLOW_SCAN_INTERVAL = "slow_scan_interval"
+
+DEFAULT_SLOW_SCAN_INTERVAL = 300
+
+# Deadband and rounding for noisy measurements, see publish.py
+CONF_PUBLISH_DEADBAND = "publish_deadband"
+
+# Seconds after which a measurement is written even if it stayed in its deadband
+CONF_PUBLISH_MAX_SILENCE = "publish_max_silence"
+
+DEFAULT_PUBLISH_MAX_SILENCE = 900
+
+# Seconds a read answer is served again to identical queries
+CONF_READ_CACHE_TTL = "read_cache_ttl"
+
+DEFAULT_READ_CACHE_TTL = 1.0
+
+# Seconds the last values stay available, marked stale, while polls fail
+CONF_STALE_GRACE_PERIOD = "stale_grace_period"
+
+DEFAULT_STALE_GRACE_PERIOD = 120
+
+# Requests in flight across all controllers of the process
+MAX_IN_FLIGHT_REQUESTS = 8
+
+# Keep-alive pool per controller; the ESP32 only copes with a few sockets
+HTTP_LIMIT_PER_HOST = 2
+
+HTTP_KEEPALIVE_TIMEOUT = 30
+
+# Longest request URI (path and query) a single batched poll may use
+QUERY_MAX_URL_LENGTH = 1024
+
+# Seconds before a key the controller rejected is queried again
+CAPABILITY_RETRY_INTERVAL = 3600
+
+# Shorter wait for a key that answered before, its error is likely transient
+CAPABILITY_RECHECK_INTERVAL = 60
+
+STORAGE_VERSION = 1
+
+# Seconds between saves of the warm-start snapshot of devices and values
+SNAPSHOT_SAVE_INTERVAL = 300
+
+# Rolling window of the per-controller request statistics
+REQUEST_STATS_WINDOW = 600
+
+REQUEST_STATS_MAX_SAMPLES = 2000
+
+# Request timeout derived from the recent p95 latency, clamped to these seconds
+REQUEST_TIMEOUT_MIN = 2
+
+REQUEST_TIMEOUT_MAX = 10
+
+REQUEST_TIMEOUT_FACTOR = 4
+
+# Retries of idempotent reads after connection errors, timeouts and 5xx answers
+READ_RETRIES = 2
+
+RETRY_BACKOFF = 0.25
+
+# Consecutive failures after which a host is failed fast, and the seconds
+# before it is probed again (doubling up to the maximum while it stays down)
+BREAKER_FAILURE_THRESHOLD = 3
+
+BREAKER_RESET_TIMEOUT = 15
+
+BREAKER_MAX_RESET_TIMEOUT = 300
+
+# Writes to the same key within this many seconds collapse into the last one;
+# a continuous burst is still flushed at least every WRITE_MAX_DELAY seconds
+WRITE_DEBOUNCE = 0.3
+
+WRITE_MAX_DELAY = 1.0
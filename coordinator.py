@@ -1,87 +1,434 @@
 from dataclasses import dataclass
-from datetime import timedelta
 import logging
+import time
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_HOST, CONF_SCAN_INTERVAL
-from homeassistant.core import HomeAssistant
+from homeassistant.const import CONF_SCAN_INTERVAL
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 from .cres_control import CresControl, APIAuthError, DeviceType
-from .const import DEFAULT_SCAN_INTERVAL, DOMAIN
+from .cres_schema import ALL_TIERS, PollTier
+from .cres_query import is_error_value
+from .cres_writes import WriteBuffer, format_write_value
+from .const import (
+    CONF_PUBLISH_DEADBAND,
+    CONF_PUBLISH_MAX_SILENCE,
+    CONF_SLOW_SCAN_INTERVAL,
+    CONF_STALE_GRACE_PERIOD,
+    DEFAULT_PUBLISH_MAX_SILENCE,
+    DEFAULT_SCAN_INTERVAL,
+    DEFAULT_SLOW_SCAN_INTERVAL,
+    DEFAULT_STALE_GRACE_PERIOD,
+    DOMAIN,
+    SNAPSHOT_SAVE_INTERVAL,
+)
+from .publish import DeadbandPublisher, publish_policy
 
 _LOGGER = logging.getLogger(__name__)
 
+FAST_TIERS = frozenset({PollTier.FAST})
+
+
+def entry_coordinators(hass: HomeAssistant, entry: ConfigEntry, pending=False):
+    """Return the coordinators of an entry, one per controller.
+
+    Fleet units that have not answered since setup have no entities yet and
+    are left out unless `pending` is set.
+    """
+    coordinators = hass.data[DOMAIN][entry.entry_id]["coordinators"].values()
+    return [coordinator for coordinator in coordinators if pending or not coordinator.pending_setup]
+
 
 class ExampleCoordinator(DataUpdateCoordinator):
     """Coordinator to manage the integration with the CresControl system."""
 
-    def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry, controller: CresControl) -> None:
-        """Initialize the coordinator."""
-        self.host = config_entry.data[CONF_HOST]
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        config_entry: ConfigEntry,
+        controller: CresControl,
+        snapshot_store=None,
+        unit_id=None,
+    ) -> None:
+        """Initialize the coordinator.
+
+        `unit_id` tells the controllers of a fleet entry apart; it is None
+        for entries of a single controller.
+        """
+        self.host = controller.reqAddr
+        self.unit_id = unit_id
+        self._entry_id = config_entry.entry_id
         self.poll_interval = config_entry.options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)
+        self.slow_poll_interval = config_entry.options.get(
+            CONF_SLOW_SCAN_INTERVAL, DEFAULT_SLOW_SCAN_INTERVAL
+        )
+        self.publish_deadband = config_entry.options.get(CONF_PUBLISH_DEADBAND, True)
+        self.publish_max_silence = config_entry.options.get(
+            CONF_PUBLISH_MAX_SILENCE, DEFAULT_PUBLISH_MAX_SILENCE
+        )
         self.controller = controller
+        self._last_slow_poll = None
+        self._slow_tier_dirty = False
+        # device key -> number of entities reading it; None until the first subscription
+        self._subscriptions = None
+        # Change tracking: every poll bumps data_version, changed keys remember it
+        self.data_version = 0
+        self._key_versions = {}
+        self._raw_values = {}
+        self.notify_stats = {"writes": 0, "suppressed": 0}
+        self._data = None
+        controller.req.add_write_listener(self._handle_write)
+        # Commands from entities are debounced and flushed together. Written
+        # values are shown right away and held against polls that started
+        # before the controller answered: key -> (previous raw, shown raw,
+        # poll sequence of the confirmation or None while unconfirmed)
+        self.writes = WriteBuffer(controller.req, self._async_confirm_writes)
+        self._optimistic = {}
+        self._poll_seq = 0
+        # Warm start: devices and values restored from the last snapshot are
+        # stale until the controller answered a poll
+        self.snapshot_store = snapshot_store
+        self._restored_topology = None
+        self._snapshot_saved = None
+        # Stale-while-revalidate: failed polls keep serving the last values,
+        # marked stale, for the grace period after the last good sample or
+        # the restore from a snapshot
+        self.stale_grace_period = config_entry.options.get(
+            CONF_STALE_GRACE_PERIOD, DEFAULT_STALE_GRACE_PERIOD
+        )
+        self.stale = False
+        self.last_sample_time = None
+        self._grace_start = None
+        # Phase and lag of the scheduled polls, set by the PollScheduler
+        self.schedule_stats = None
+        # Set for a fleet unit that failed its setup: it is polled like the
+        # others and its first good poll reloads the entry to add its entities
+        self.pending_setup = False
         super().__init__(
             hass,
             _LOGGER,
-            name=f"{DOMAIN} ({config_entry.unique_id})",
+            name=f"{DOMAIN} ({config_entry.unique_id if unit_id is None else self.host})",
             update_method=self.async_update_data,
-            update_interval=timedelta(seconds=self.poll_interval),
+            # No timer of its own, the PollScheduler polls at the poll
+            # interval with a phase staggered against the other controllers
+            update_interval=None,
+        )
+
+    def create_publisher(self, measurement):
+        """Return a deadband publisher configured from the entry options."""
+        return DeadbandPublisher(
+            publish_policy(measurement, self.publish_deadband, self.publish_max_silence)
         )
 
+    @callback
+    def async_subscribe_keys(self, keys):
+        """Poll keys on behalf of an entity until the returned callback is called."""
+        if self._subscriptions is None:
+            self._subscriptions = {}
+        keys = tuple(keys)
+        for key in keys:
+            self._subscriptions[key] = self._subscriptions.get(key, 0) + 1
+
+        @callback
+        def unsubscribe():
+            for key in keys:
+                count = self._subscriptions[key] - 1
+                if count:
+                    self._subscriptions[key] = count
+                else:
+                    del self._subscriptions[key]
+
+        return unsubscribe
+
+    @property
+    def subscribed_keys(self):
+        """Keys with at least one listening entity, or None to poll everything."""
+        return self._subscriptions
+
+    def _track_changes(self, values):
+        """Bump the version of every key whose raw value changed."""
+        self.data_version += 1
+        if not values:
+            return
+        version = self.data_version
+        raw_values = self._raw_values
+        for key, raw in values.items():
+            if raw_values.get(key) != raw:
+                raw_values[key] = raw
+                self._key_versions[key] = version
+
+    def keys_changed_since(self, keys, version):
+        """Return True if any of keys changed after data_version `version`."""
+        key_versions = self._key_versions
+        return any(key_versions.get(key, 0) > version for key in keys)
+
+    async def async_write(self, key, value, debounce=True):
+        """Write a device key through the buffer and show the value at once.
+
+        Returns the controller's answer for the key. A rejected or failed
+        write rolls the shown value back.
+        """
+        answers = await self.async_write_many({key: value}, debounce)
+        return answers[key]
+
+    async def async_write_many(self, values, debounce=True):
+        """Write several device keys in the same command, see async_write.
+
+        Returns the controller's answers by key.
+        """
+        shown = {}
+        for key, value in values.items():
+            raw = format_write_value(value)
+            pending = self._optimistic.get(key)
+            if pending is not None and pending[2] is None:
+                previous = pending[0]
+            else:
+                previous = self._raw_values.get(key)
+            self._optimistic[key] = (previous, raw, None)
+            shown[key] = raw
+        self._async_apply_values(shown)
+        return await self.writes.write_many(values, debounce)
+
+    @callback
+    def _async_apply_values(self, values):
+        """Put raw values into the device states and notify affected entities."""
+        self.controller.apply_values(values)
+        self._track_changes(values)
+        if self._data is not None:
+            self.async_update_listeners()
+
+    async def _async_confirm_writes(self, sent, answers):
+        """Replace optimistic values by the echo, or roll them back."""
+        confirmed = {}
+        unanswered = []
+        for key, raw in sent.items():
+            pending = self._optimistic.get(key)
+            # A newer write to the key is still on its way
+            if pending is None or pending[1] != raw or pending[2] is not None:
+                continue
+            answer = None if answers is None else answers.get(key)
+            if answer is not None and not is_error_value(answer):
+                confirmed[key] = answer
+            elif answers is not None and answer is None:
+                del self._optimistic[key]
+                unanswered.append(key)
+                continue
+            elif pending[0] is not None:
+                _LOGGER.warning(f"Schreiben von {key}={raw} fehlgeschlagen, setze {pending[0]} zurück")
+                confirmed[key] = pending[0]
+            else:
+                # Nothing to roll back to, the next poll shows the real value
+                del self._optimistic[key]
+                continue
+            self._optimistic[key] = (pending[0], confirmed[key], self._poll_seq)
+        if confirmed:
+            self._async_apply_values(confirmed)
+        if unanswered:
+            await self.async_refresh_keys(unanswered)
+
+    async def async_refresh_keys(self, keys):
+        """Re-read only `keys` and notify entities whose values changed.
+
+        Returns the raw values by key, or None if the read failed.
+        """
+        values = await self.controller.update_all(ALL_TIERS, set(keys))
+        if values is None or self._data is None:
+            return values
+        if self._optimistic:
+            values = self._hold_written_values(values, self._poll_seq)
+        self._track_changes(values)
+        # Not async_set_updated_data, a partial read must not delay the next poll
+        self.async_update_listeners()
+        return values
+
+    def _hold_written_values(self, values, poll_seq):
+        """Keep written values a poll read before the controller confirmed them."""
+        held = {}
+        for key, (_, raw, confirmed_seq) in list(self._optimistic.items()):
+            if confirmed_seq is not None and confirmed_seq < poll_seq:
+                # This poll started after the confirmation, it shows the truth
+                del self._optimistic[key]
+            else:
+                held[key] = raw
+        if held:
+            self.controller.apply_values(held)
+        return {key: raw for key, raw in values.items() if key not in held}
+
+    @callback
+    def async_restore_snapshot(self, snapshot):
+        """Show the devices and values of a snapshot until the first poll."""
+        values = self.controller.restore_snapshot(snapshot)
+        self._track_changes(values)
+        self._restored_topology = self.controller.topology()
+        self.stale = True
+        self.last_sample_time = snapshot.get("sampled_at")
+        # However old the snapshot, it is served for a full grace period
+        self._grace_start = time.time()
+        self._data = self._collect_data()
+        self.data = self._data
+
+    def snapshot(self):
+        """Return what async_restore_snapshot() needs after a restart."""
+        return {
+            "type": self.controller.firmware_type,
+            **self.controller.topology(),
+            "sampled_at": self.last_sample_time,
+            "values": dict(self._raw_values),
+        }
+
+    def _schedule_snapshot_save(self):
+        if self.snapshot_store is None:
+            return
+        now = time.monotonic()
+        if self._snapshot_saved is None or now - self._snapshot_saved >= SNAPSHOT_SAVE_INTERVAL:
+            self._snapshot_saved = now
+            self.snapshot_store.async_delay_save(self.snapshot, 1)
+
+    async def async_save_snapshot(self):
+        """Save the snapshot now, e.g. before the entry unloads."""
+        if self.snapshot_store is not None and self._data is not None and self._restored_topology is None:
+            await self.snapshot_store.async_save(self.snapshot())
+
+    def _handle_write(self, keys):
+        """Re-read the slow tier on the next poll after its keys were written."""
+        if any(self.controller.key_tier(key) == PollTier.SLOW for key in keys):
+            self._slow_tier_dirty = True
+
+    def _poll_tiers(self):
+        """Return the tiers due in this cycle.
+
+        The slow tier counts as polled only once the poll succeeded.
+        """
+        now = time.monotonic()
+        if (
+            self._slow_tier_dirty
+            or self._last_slow_poll is None
+            or now - self._last_slow_poll >= self.slow_poll_interval
+        ):
+            self._slow_tier_dirty = False
+            return ALL_TIERS
+        return FAST_TIERS
+
     async def async_update_data(self):
+        """Poll the controller, serving the last values for a while if it fails."""
+        try:
+            data = await self._async_poll()
+        except UpdateFailed as err:
+            if (
+                self._data is None
+                or self._grace_start is None
+                or time.time() - self._grace_start > self.stale_grace_period
+            ):
+                raise
+            if not self.stale:
+                _LOGGER.warning(
+                    f"Abfrage von {self.host} fehlgeschlagen, zeige die letzten Werte "
+                    f"bis zu {self.stale_grace_period}s weiter: {err}"
+                )
+            self.stale = True
+            return self._data
+
+        if self.stale:
+            _LOGGER.info(f"{self.host} antwortet wieder")
+        self.stale = False
+        self.last_sample_time = self._grace_start = time.time()
+        if self.pending_setup:
+            self.pending_setup = False
+            _LOGGER.info(f"{self.host} antwortet, lade neu um seine Entitäten anzulegen")
+            self.hass.async_create_task(self.hass.config_entries.async_reload(self._entry_id))
+        return data
+
+    def sample_age(self):
+        """Seconds since the last successful poll, None before the first one."""
+        if self.last_sample_time is None:
+            return None
+        return max(0.0, time.time() - self.last_sample_time)
+
+    async def _async_poll(self):
         """Fetch data from the API endpoint."""
         try:
             _LOGGER.debug("Updating CresControl data from API")
 
-            # Initialize devices only if they haven't been initialized
-            if not self.controller.devices:
-                await self.controller.init_devices()
-
-            # Update all devices with consolidated requests
-            await self.controller.update_all()
+            # Initialize devices only if they haven't been initialized, or
+            # only from a snapshot
+            restored = self._restored_topology is not None
+            if not self.controller.devices or restored:
+                values = await self.controller.init_devices(discover=restored)
+                self._last_slow_poll = time.monotonic()
+                self._async_reconcile_snapshot()
+            else:
+                # Update all devices with consolidated requests of the due tiers
+                self._poll_seq += 1
+                started = time.monotonic()
+                tiers = self._poll_tiers()
+                values = await self.controller.update_all(tiers, self.subscribed_keys)
+                if values is None:
+                    if tiers is ALL_TIERS:
+                        # Ask for the slow keys again in the next cycle
+                        self._slow_tier_dirty = True
+                    raise UpdateFailed("Poll failed")
+                if tiers is ALL_TIERS:
+                    self._last_slow_poll = started
+                if self._optimistic and values:
+                    values = self._hold_written_values(values, self._poll_seq)
+            self._track_changes(values)
 
-            # Collect and organize data
-            data = {
-                "fan": self.collect_fan_data(),
-                "switches": self.collect_switch_data(),
-                "inputs": self.collect_input_data(),
-                "outputs": self.collect_output_data(),
-                "sensors": self.collect_sensor_data(),
-            }
+            # The collected dicts are live views of the device index, so they
+            # are only gathered once after the devices were initialized
+            if self._data is None:
+                self._data = self._collect_data()
+            data = self._data
+            self._schedule_snapshot_save()
 
             _LOGGER.debug("Fetched data from CresControl: %s", data)
+            _LOGGER.debug("State writes so far: %s", self.notify_stats)
             return data
 
         except APIAuthError as err:
             _LOGGER.error("API Auth Error: %s", err)
             raise UpdateFailed("Authentication Error") from err
+        except UpdateFailed:
+            raise
         except Exception as err:
             _LOGGER.error("Error communicating with API: %s", err)
             raise UpdateFailed("Error communicating with API") from err
 
-    async def async_update_single_device(self, device_id: str):
-        """Update a specific device by its ID."""
+    def _collect_data(self):
+        return {
+            "fan": self.collect_fan_data(),
+            "switches": self.collect_switch_data(),
+            "inputs": self.collect_input_data(),
+            "outputs": self.collect_output_data(),
+            "sensors": self.collect_sensor_data(),
+        }
+
+    @callback
+    def _async_reconcile_snapshot(self):
+        """Leave the snapshot behind, reloading if the channels changed since."""
+        restored, self._restored_topology = self._restored_topology, None
+        if restored is not None and self.controller.topology() != restored:
+            _LOGGER.info(f"Geräte von {self.host} haben sich seit dem Snapshot geändert, lade neu")
+            self.hass.async_create_task(self.hass.config_entries.async_reload(self._entry_id))
+
+    async def async_update_single_device(self, device_id: str, device_type=None, fields=None):
+        """Re-read one channel, e.g. output "c", or only some of its fields.
+
+        Ids are only unique per type, so pass `device_type` for inputs and
+        outputs. Only entities showing a changed key write their state.
+        """
         try:
             _LOGGER.debug(f"Updating device {device_id} from API")
 
-            # Finde das entsprechende Gerät und aktualisiere es gezielt
-            device = self.controller.get_device_by_id(device_id)
-            if device:
-                if device.device_type == DeviceType.SENSOR:
-                    await self.controller.update_sensors()  # Aktualisiere alle Sensoren
-                elif device.device_type == DeviceType.FAN:
-                    await self.controller.update_fan()  # Aktualisiere den Lüfter
-                elif device.device_type == DeviceType.INPUT:
-                    await self.controller.update_inputs()  # Aktualisiere alle Eingaben
-                elif device.device_type == DeviceType.OUTPUT:
-                    await self.controller.update_outputs()  # Aktualisiere alle Ausgaben
-                elif device.device_type == DeviceType.SWITCH:
-                    await self.controller.update_switches()  # Aktualisiere alle Schalter
-                else:
-                    _LOGGER.warning(f"Device type {device.device_type} not recognized")
-                return {device.device_id: device.state}
-            else:
+            device = self.controller.devices.get(device_id, device_type)
+            if device is None:
                 _LOGGER.warning(f"Device with ID {device_id} not found")
                 return {}
+            keys = self.controller.channel_keys(device.device_type, device.device_id, fields)
+            if not keys:
+                _LOGGER.warning(f"No keys to refresh for device {device_id} and fields {fields}")
+                return {}
+            if await self.async_refresh_keys(keys) is None:
+                raise UpdateFailed(f"Reading {keys} failed")
+            return {device.device_id: device.state}
         except Exception as err:
             _LOGGER.error(f"Error updating device {device_id}: {err}")
             raise UpdateFailed(f"Error updating device {device_id}") from err
@@ -95,33 +442,16 @@ class ExampleCoordinator(DataUpdateCoordinator):
 
     def collect_switch_data(self):
         """Collect switch data from the CresControl object."""
-        switches = {}
-        for device in self.controller.devices:
-            if device.device_type == DeviceType.SWITCH:
-                switch_name = device.device_id
-                switches[switch_name] = device.state
-        return switches
+        return self.controller.devices.states(DeviceType.SWITCH)
 
     def collect_input_data(self):
         """Collect input data from the CresControl object."""
-        inputs = {}
-        for device in self.controller.devices:
-            if device.device_type == DeviceType.INPUT:
-                inputs[device.device_id] = device.state
-        return inputs
+        return self.controller.devices.states(DeviceType.INPUT)
 
     def collect_output_data(self):
         """Collect output data from the CresControl object."""
-        outputs = {}
-        for device in self.controller.devices:
-            if device.device_type == DeviceType.OUTPUT:
-                outputs[device.device_id] = device.state
-        return outputs
+        return self.controller.devices.states(DeviceType.OUTPUT)
 
     def collect_sensor_data(self):
         """Collect sensor data from the CresControl object."""
-        sensors = {}
-        for device in self.controller.devices:
-            if device.device_type == DeviceType.SENSOR:
-                sensors[device.device_id] = device.state
-        return sensors
+        return self.controller.devices.states(DeviceType.SENSOR)
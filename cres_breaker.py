@@ -0,0 +1,98 @@
+from enum import StrEnum
+from .const import BREAKER_FAILURE_THRESHOLD, BREAKER_MAX_RESET_TIMEOUT, BREAKER_RESET_TIMEOUT
+import aiohttp
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class BreakerState(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(aiohttp.ClientConnectionError):
+    """The host failed repeatedly and is not contacted until its next probe."""
+
+
+class CircuitBreaker:
+    """Fail fast while a host is unreachable and probe it back to health.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    requests raise CircuitOpenError without touching the network. Once the
+    reset timeout has passed a single request is let through as a probe;
+    its success closes the circuit, its failure reopens it for twice as long.
+    """
+
+    def __init__(
+        self,
+        host,
+        failure_threshold=BREAKER_FAILURE_THRESHOLD,
+        reset_timeout=BREAKER_RESET_TIMEOUT,
+        max_reset_timeout=BREAKER_MAX_RESET_TIMEOUT,
+    ):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.open_count = 0
+        self._current_timeout = reset_timeout
+        self._probing = False
+
+    def before_request(self):
+        """Raise CircuitOpenError unless a request may be sent now."""
+        if self.state == BreakerState.CLOSED:
+            return
+        if self.state == BreakerState.OPEN:
+            remaining = self.opened_at + self._current_timeout - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(f"{self.host} nicht erreichbar, nächster Versuch in {remaining:.0f}s")
+            self.state = BreakerState.HALF_OPEN
+        if self._probing:
+            raise CircuitOpenError(f"{self.host} wird gerade geprüft")
+        self._probing = True
+
+    def record_success(self):
+        if self.state != BreakerState.CLOSED:
+            _LOGGER.info(f"{self.host} ist wieder erreichbar")
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self._current_timeout = self.reset_timeout
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == BreakerState.HALF_OPEN:
+            self._current_timeout = min(self._current_timeout * 2, self.max_reset_timeout)
+            self._open()
+        elif self.state == BreakerState.CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+        self._probing = False
+
+    def release(self):
+        """Forget an unfinished probe, e.g. after the request was cancelled."""
+        if self._probing and self.state == BreakerState.HALF_OPEN:
+            self.state = BreakerState.OPEN
+        self._probing = False
+
+    def _open(self):
+        self.state = BreakerState.OPEN
+        self.opened_at = time.monotonic()
+        self.open_count += 1
+        _LOGGER.warning(
+            f"{self.host} nach {self.failures} Fehlern nicht erreichbar, "
+            f"nächster Versuch in {self._current_timeout}s"
+        )
+
+    def as_dict(self):
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "open_count": self.open_count,
+            "reset_timeout": self._current_timeout,
+        }
@@ -0,0 +1,89 @@
+from .const import CAPABILITY_RECHECK_INTERVAL, CAPABILITY_RETRY_INTERVAL
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CresCapabilities:
+    """Remember which query keys a controller does and does not answer.
+
+    Keys rejected during a poll are retried after `retry_interval`, or
+    after the shorter `recheck_interval` if they answered before: an error
+    value from a key the controller supports is usually transient. Keys
+    a capability probe settled stay settled until the probe data is
+    replaced, e.g. after a firmware change. Only keys the controller
+    answered or rejected outright are settled.
+    """
+
+    def __init__(self, retry_interval=CAPABILITY_RETRY_INTERVAL, recheck_interval=CAPABILITY_RECHECK_INTERVAL):
+        self.retry_interval = retry_interval
+        self.recheck_interval = recheck_interval
+        # key -> time.monotonic() when the rejected key is queried again,
+        # None to never query it again
+        self.unsupported = {}
+        # Keys the controller answered at least once
+        self.answered = set()
+        # key -> bool, filled by a probe or restored from storage
+        self.probed = {}
+
+    def is_supported(self, key):
+        if self.probed.get(key) is False:
+            return False
+        if key not in self.unsupported:
+            return True
+        retry_at = self.unsupported[key]
+        if retry_at is not None and time.monotonic() >= retry_at:
+            del self.unsupported[key]
+            return True
+        return False
+
+    def is_known(self, key):
+        """Return True if a probe already settled this key."""
+        return key in self.probed
+
+    def filter(self, keys):
+        """Return keys without the ones known to be unsupported."""
+        if not self.unsupported and not self.probed:
+            return list(keys)
+        return [key for key in keys if self.is_supported(key)]
+
+    def mark_unsupported(self, key):
+        interval = self.recheck_interval if key in self.answered else self.retry_interval
+        if key not in self.unsupported:
+            _LOGGER.info(
+                f"Key {key} wird vom Gerät nicht unterstützt, nächste Abfrage in {interval}s"
+                if interval is not None
+                else f"Key {key} wird vom Gerät nicht unterstützt und nicht mehr abgefragt"
+            )
+        self.unsupported[key] = None if interval is None else time.monotonic() + interval
+
+    def mark_supported(self, key):
+        self.unsupported.pop(key, None)
+
+    def record_answered(self, values):
+        """Remember the keys of a poll that the controller answered."""
+        self.answered.update(values)
+
+    def record_probe(self, keys, values, rejected):
+        """Settle the probed keys that answered or were definitely rejected.
+
+        Keys that missed the probe for another reason, e.g. a timeout, stay
+        open and are probed again next time.
+        """
+        for key in keys:
+            if key in values:
+                self.probed[key] = True
+            elif key in rejected:
+                self.probed[key] = False
+
+    def as_dict(self):
+        return {
+            "supported": sorted(key for key, supported in self.probed.items() if supported),
+            "unsupported": sorted(key for key, supported in self.probed.items() if not supported),
+        }
+
+    def load(self, data):
+        """Restore probe results saved with as_dict()."""
+        self.probed = {key: True for key in data.get("supported", [])}
+        self.probed.update({key: False for key in data.get("unsupported", [])})
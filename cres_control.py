@@ -1,10 +1,14 @@
 import asyncio
 from .cres_system import CresSystem
 from .cres_sensor import CresSensors
-from .cres_fan import CresFan
-from .cres_inputs import CresInputs
-from .cres_outputs import CresOutputs
-from .cres_switch import CresSwitches
+from .cres_fan import CresFan, FAN_FIELDS
+from .cres_inputs import CresInputs, INPUT_FIELDS
+from .cres_outputs import CresOutputs, OUTPUT_FIELDS, OUTPUT_PWM_FIELDS
+from .cres_switch import CresSwitches, SWITCH_FIELDS
+from .cres_schema import ALL_TIERS, PollSchema, PollTier
+from .cres_req import CresRequest, CresSession
+from .cres_query import QueryCompiler
+from .const import DEFAULT_READ_CACHE_TTL
 from dataclasses import dataclass
 from enum import StrEnum
 import logging
@@ -30,16 +34,87 @@ class Device:
     state: dict
 
 
+class DeviceIndex:
+    """Devices of one controller, indexed by id, unique id and type.
+
+    Ids are only unique per type (input "a" and output "a"); get() without a
+    type returns the first device added with the id. `states(device_type)`
+    returns a live dict of device id -> state that is kept up to date by
+    add() and remove(), so readers never rebuild it.
+    """
+
+    def __init__(self):
+        self._by_unique_id = {}
+        self._by_id = {}
+        self._by_type = {device_type: {} for device_type in DeviceType}
+        self._states_by_type = {device_type: {} for device_type in DeviceType}
+
+    def add(self, device):
+        replaced = self._by_type[device.device_type].get(device.device_id)
+        if replaced is not None:
+            self.remove(replaced.device_unique_id)
+        self.remove(device.device_unique_id)
+        self._by_unique_id[device.device_unique_id] = device
+        self._by_id.setdefault(device.device_id, device)
+        self._by_type[device.device_type][device.device_id] = device
+        self._states_by_type[device.device_type][device.device_id] = device.state
+
+    def remove(self, device_unique_id):
+        device = self._by_unique_id.pop(device_unique_id, None)
+        if device is None:
+            return None
+        self._by_type[device.device_type].pop(device.device_id, None)
+        self._states_by_type[device.device_type].pop(device.device_id, None)
+        if self._by_id.get(device.device_id) is device:
+            del self._by_id[device.device_id]
+            for other in self._by_unique_id.values():
+                if other.device_id == device.device_id:
+                    self._by_id[device.device_id] = other
+                    break
+        return device
+
+    def get(self, device_id, device_type=None):
+        if device_type is None:
+            return self._by_id.get(device_id)
+        return self._by_type[device_type].get(device_id)
+
+    def get_by_unique_id(self, device_unique_id):
+        return self._by_unique_id.get(device_unique_id)
+
+    def of_type(self, device_type):
+        return list(self._by_type[device_type].values())
+
+    def states(self, device_type):
+        return self._states_by_type[device_type]
+
+    def __iter__(self):
+        return iter(list(self._by_unique_id.values()))
+
+    def __len__(self):
+        return len(self._by_unique_id)
+
+
 class CresControl:
-    def __init__(self, reqAddr):
+    def __init__(self, reqAddr, session=None, cache_ttl=DEFAULT_READ_CACHE_TTL, limiter=None):
         self.reqAddr = reqAddr
-        self.system = CresSystem(reqAddr)
-        self.sensors = CresSensors(reqAddr)
-        self.fan = CresFan(reqAddr)
-        self.inputs = CresInputs(reqAddr)
-        self.outputs = CresOutputs(reqAddr)
-        self.switches = CresSwitches(reqAddr)
-        self.devices = []
+        # All subsystems share one request object and its keep-alive pool
+        self._owns_session = session is None
+        self.session = session if session is not None else CresSession()
+        self.req = CresRequest(reqAddr, self.session, cache_ttl, limiter)
+        self.system = CresSystem(reqAddr, req=self.req)
+        self.sensors = CresSensors(reqAddr, req=self.req)
+        self.fan = CresFan(reqAddr, req=self.req)
+        self.inputs = CresInputs(reqAddr, req=self.req)
+        self.outputs = CresOutputs(reqAddr, req=self.req)
+        self.switches = CresSwitches(reqAddr, req=self.req)
+        self.compiler = QueryCompiler(self.req)
+        self.capabilities = self.req.capabilities
+        self.devices = DeviceIndex()
+
+        # Channels a capability probe may confirm or drop
+        self.input_candidates = list(self.inputs.inputList)
+        self.output_candidates = list(self.outputs.outputList)
+        self.switch_candidates = list(self.switches.switchList)
 
         # Initialize placeholders for data
         self.system_data = None
@@ -49,13 +124,29 @@ class CresControl:
         self.outputs_data = None
         self.switches_data = None
 
-    async def init_devices(self):
-        # Sensors Initialization
-        await self.sensors.get_sensors()  
-        await self.sensors.update_sensor_data() 
+    async def init_devices(self, discover=False):
+        """Read every subsystem and add its channels to the device index.
+
+        With `discover` the sensor extensions are listed again, e.g. when
+        they were restored from a snapshot and may have changed since.
+        """
+        # Sensors Initialization (the capability probe may have listed them already)
+        if discover or not self.sensors.sensors:
+            await self.sensors.get_sensors()  
+
+        # Read every subsystem with one compiled poll
+        values = await self.poll()
+        self._add_devices()
+        return values
+
+    def _add_devices(self):
+        # Extensions unplugged since the last discovery
+        for device in list(self.devices.of_type(DeviceType.SENSOR)):
+            if device.device_id not in self.sensors.sensor_data:
+                self.devices.remove(device.device_unique_id)
 
         for sensor_id, sensor_state in self.sensors.sensor_data.items():
-            self.devices.append(
+            self.devices.add(
                 Device(
                     device_id=sensor_id,
                     device_unique_id=f"{self.reqAddr}_{sensor_id}",
@@ -66,7 +157,6 @@ class CresControl:
             )
 
         # Initialize Fan
-        await self.fan.getAllFanData()
         self.fan_data = {
             "enabled": self.fan.enabled,
             "dutyCycle": self.fan.duty_cycle,
@@ -82,14 +172,14 @@ class CresControl:
                 name="fan",
                 state=self.fan_data,
             )
-            self.devices.append(fan_device)
+            self.devices.add(fan_device)
         else:
             pass
 
-        # Initialize Outputs using getAllOutputs
-        self.outputs_data = await self.outputs.getAllOutputsData()
+        # Initialize Outputs
+        self.outputs_data = self.outputs.outputs_data
         for output_name, output_state in self.outputs_data.items():
-            self.devices.append(
+            self.devices.add(
                 Device(
                     device_id=output_name,
                     device_unique_id=f"{self.reqAddr}_O{output_name}",
@@ -100,9 +190,8 @@ class CresControl:
             )
 
         # Initialize Inputs
-        await self.inputs.getAllInputsData()  # Verwende die neue getAllInputs-Methode
         for input_name, input_state in self.inputs.inputs_data.items():
-            self.devices.append(
+            self.devices.add(
                 Device(
                     device_id=input_name,
                     device_unique_id=f"{self.reqAddr}_I{input_name}",
@@ -113,9 +202,8 @@ class CresControl:
             )
 
         # Initialize Switches
-        await self.switches.getAllSwitchData()
         for switch_name, switch_state in self.switches.switch_data.items():
-            self.devices.append(
+            self.devices.add(
                 Device(
                     device_id=switch_name,
                     device_unique_id=f"{self.reqAddr}_Switch_{switch_name}",
@@ -125,46 +213,193 @@ class CresControl:
                 )
             )
 
+    def topology(self):
+        """Channels of the controller, as restore_snapshot() expects them."""
+        return {
+            "sensors": list(self.sensors.sensors),
+            "inputs": list(self.inputs.inputList),
+            "pwm": list(self.outputs.isPWM),
+            "switches": list(self.switches.switchList),
+        }
+
+    def restore_snapshot(self, snapshot):
+        """Set up the devices from a snapshot without asking the controller.
+
+        `snapshot` holds the firmware type, the topology() lists and raw
+        values by key. Returns the values applied to the device states.
+        """
+        self.system.type = snapshot.get("type", "")
+        self.sensors.set_sensors(snapshot.get("sensors", []))
+        self.inputs.configureInputs(snapshot.get("inputs", self.input_candidates))
+        self.outputs.configurePWM(snapshot.get("pwm", []))
+        self.switches.configureSwitches(snapshot.get("switches", self.switch_candidates))
+        self._add_devices()
+        values = snapshot.get("values", {})
+        self.apply_values(values)
+        return values
+
+    @property
+    def firmware_type(self):
+        return self.system.type
+
+    def _probe_schema(self):
+        """Schema with every key any channel or extension might answer."""
+        channels = [("fan", "fan", FAN_FIELDS)]
+        channels += [(name, f"in-{name}", INPUT_FIELDS) for name in self.input_candidates]
+        channels += [
+            (name, f"out-{name}", OUTPUT_FIELDS + OUTPUT_PWM_FIELDS) for name in self.output_candidates
+        ]
+        channels += [(name, f"switch-{name}", SWITCH_FIELDS) for name in self.switch_candidates]
+        channels += [self.sensors.sensor_channel(sensor_id) for sensor_id in self.sensors.sensors]
+        return PollSchema(channels)
+
+    async def probe_capabilities(self):
+        """Probe every key not settled yet and configure the subsystems.
+
+        Returns True if new keys were probed, so the caller knows to persist
+        the result.
+        """
+        if not self.sensors.sensors:
+            await self.sensors.get_sensors()
+
+        keys = [key for key in self._probe_schema().keys if not self.capabilities.is_known(key)]
+        if keys:
+            _LOGGER.debug(f"Prüfe {len(keys)} Keys auf Unterstützung")
+            values = await self.compiler.fetch(keys)
+            # A key missing from the batches may have hit a transient error,
+            # only one that is rejected again on its own is settled
+            missing = [key for key in keys if key not in values]
+            rejected = await self.compiler.confirm_rejected(missing, values) if missing else set()
+            self.capabilities.record_probe(keys, values, rejected)
+
+        self.apply_capabilities()
+        return bool(keys)
+
+    def apply_capabilities(self):
+        """Limit channels and PWM outputs to what the controller supports."""
+        supports = self.capabilities.is_supported
+        self.inputs.configureInputs(
+            [name for name in self.input_candidates if supports(f"in-{name}:voltage")]
+        )
+        self.outputs.configurePWM(
+            [name for name in self.output_candidates if supports(f"out-{name}:pwm-enabled")]
+        )
+        self.switches.configureSwitches(
+            [name for name in self.switch_candidates if supports(f"switch-{name}:enabled")]
+        )
+
     def get_device_by_id(self, device_id):
-        for device in self.devices:
-            if device.device_id == device_id:
-                return device
-        return None
+        return self.devices.get(device_id)
+
+    def get_device_by_unique_id(self, device_unique_id):
+        return self.devices.get_by_unique_id(device_unique_id)
+
+    def _subsystems(self):
+        return (self.sensors, self.fan, self.inputs, self.outputs, self.switches)
+
+    def _poll_groups(self, tiers=ALL_TIERS, keys=None):
+        if keys is None:
+            return [
+                (subsystem.poll_keys(tiers), subsystem.parse_poll)
+                for subsystem in self._subsystems()
+            ]
+        return [
+            ([key for key in subsystem.poll_keys(tiers) if key in keys], subsystem.parse_poll)
+            for subsystem in self._subsystems()
+        ]
+
+    async def poll(self, tiers=ALL_TIERS, keys=None):
+        """Read all subsystems with as few batched requests as possible.
+
+        `keys` limits the poll to those device keys, e.g. the ones enabled
+        entities read; None polls everything.
+        """
+        return await self.compiler.fetch_groups(self._poll_groups(tiers, keys))
+
+    def _subsystem(self, device_type):
+        return {
+            DeviceType.SENSOR: self.sensors,
+            DeviceType.FAN: self.fan,
+            DeviceType.INPUT: self.inputs,
+            DeviceType.OUTPUT: self.outputs,
+            DeviceType.SWITCH: self.switches,
+        }.get(device_type)
+
+    def channel_keys(self, device_type, device_id, fields=None):
+        """Return the device keys of one channel, e.g. ("out-c:voltage",).
+
+        `fields` limits them to field keys like "voltage" or "pwm-enabled".
+        """
+        subsystem = self._subsystem(device_type)
+        if subsystem is None:
+            return ()
+        return subsystem.schema.keys_of(device_id, fields)
+
+    def key_tier(self, key):
+        """Return the poll tier of a device key, FAST for unknown keys."""
+        for subsystem in self._subsystems():
+            tier = subsystem.schema.tiers.get(key)
+            if tier is not None:
+                return tier
+        return PollTier.FAST
+
+    @staticmethod
+    def _sync_states(states, data):
+        for device_id, state in states.items():
+            updated_state = data.get(device_id)
+            # Subsystems usually parse straight into the device state dicts
+            if updated_state is not None and updated_state is not state:
+                state.update(updated_state)
+
+    def _sync_devices(self):
+        self._sync_sensor_devices()
+        self._sync_fan_device()
+        self._sync_input_devices()
+        self._sync_output_devices()
+        self._sync_switch_devices()
+
+    def _sync_sensor_devices(self):
+        self._sync_states(self.devices.states(DeviceType.SENSOR), self.sensors.sensor_data)
+
+    def _sync_fan_device(self):
+        self.fan_data.update(
+            {
+                "enabled": self.fan.enabled,
+                "dutyCycle": self.fan.duty_cycle,
+                "minDutyCycle": self.fan.min_duty_cycle,
+            }
+        )
+        fan_device = self.get_device_by_id("fan")
+        if fan_device and fan_device.state is not self.fan_data:
+            fan_device.state.update(self.fan_data)
+
+    def _sync_input_devices(self):
+        self._sync_states(self.devices.states(DeviceType.INPUT), self.inputs.inputs_data)
+
+    def _sync_output_devices(self):
+        self._sync_states(self.devices.states(DeviceType.OUTPUT), self.outputs_data)
+
+    def _sync_switch_devices(self):
+        self._sync_states(self.devices.states(DeviceType.SWITCH), self.switches.switch_data)
 
     async def update_sensors(self):
         try:
             await self.sensors.update_sensor_data()
-            for device in self.devices:
-                if device.device_type == DeviceType.SENSOR:
-                    sensor_id = device.device_id
-                    updated_state = self.sensors.sensor_data.get(sensor_id, {})
-                    device.state.update(updated_state)
+            self._sync_sensor_devices()
         except Exception as e:
             _LOGGER.error(f"Fehler beim Aktualisieren der Sensoren: {e}")
 
     async def update_fan(self):
         try:
             await self.fan.getAllFanData()
-            self.fan_data.update(
-                {
-                    "enabled": self.fan.enabled,
-                    "dutyCycle": self.fan.duty_cycle,
-                    "minDutyCycle": self.fan.min_duty_cycle,
-                }
-            )
-            fan_device = self.get_device_by_id("fan")
-            if fan_device:
-                fan_device.state.update(self.fan_data)
+            self._sync_fan_device()
         except Exception as e:
             _LOGGER.error(f"Fehler beim Aktualisieren der Lüfterdaten: {e}")
 
     async def update_inputs(self):
         try:
             await self.inputs.getAllInputsData() 
-            for device in self.devices:
-                if device.device_type == DeviceType.INPUT:
-                    updated_state = self.inputs.inputs_data.get(device.device_id, {})
-                    device.state.update(updated_state)
+            self._sync_input_devices()
         except Exception as e:
             _LOGGER.error(f"Fehler beim Aktualisieren der Eingabedaten: {e}")
 
@@ -172,30 +407,36 @@ class CresControl:
         try:
             # Verwende den Multi-Request für Outputs
             self.outputs_data = await self.outputs.getAllOutputsData()
-            for device in self.devices:
-                if device.device_type == DeviceType.OUTPUT:
-                    updated_state = self.outputs_data.get(device.device_id, {})
-                    device.state.update(updated_state)
+            self._sync_output_devices()
         except Exception as e:
             _LOGGER.error(f"Fehler beim Aktualisieren der Ausgabedaten: {e}")
 
     async def update_switches(self):
         try:
             await self.switches.getAllSwitchData()
-            for device in self.devices:
-                if device.device_type == DeviceType.SWITCH:
-                    switch_name = device.device_id
-                    updated_state = self.switches.switch_data.get(switch_name, {})
-                    device.state.update(updated_state)
+            self._sync_switch_devices()
         except Exception as e:
             _LOGGER.error(f"Fehler beim Aktualisieren der Switch-Daten: {e}")
 
-    async def update_all(self):
-        await self.update_sensors()
-        await self.update_fan()
-        await self.update_inputs()
-        await self.update_outputs()
-        await self.update_switches()
+    async def update_all(self, tiers=ALL_TIERS, keys=None):
+        """Update every subsystem from one compiled poll of the given tiers.
+
+        Returns the raw values by key, or None if the poll failed.
+        """
+        try:
+            values = await self.poll(tiers, keys)
+        except Exception as e:
+            _LOGGER.error(f"Fehler beim Aktualisieren der Gerätedaten: {e}")
+            return None
+
+        self._sync_devices()
+        return values
+
+    def apply_values(self, values):
+        """Parse raw values by key into the device states, e.g. a command echo."""
+        for subsystem in self._subsystems():
+            subsystem.parse_poll(values)
+        self._sync_devices()
 
     async def fetch_sensor_data(self, sensor_id):
         return self.sensors.sensor_data.get(sensor_id, {})
@@ -215,6 +456,11 @@ class CresControl:
             _LOGGER.error(f"Verbindungstest fehlgeschlagen: {e}")
             return False
 
+    async def close(self):
+        """Release the connection pool if this controller created it."""
+        if self._owns_session:
+            await self.session.close()
+
     async def get_fan_status(self):
         return str(self.fan)
 
@@ -1,35 +1,42 @@
 from .cres_req import CresRequest
+from .cres_query import QueryCompiler, is_error_value
+from .cres_schema import ALL_TIERS, Field, FieldType, PollSchema, PollTier
+from .cres_writes import format_write_value
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+FAN_FIELDS = (
+    Field("enabled", "enabled", FieldType.BOOL),
+    Field("duty-cycle", "duty_cycle"),
+    Field("duty-cycle-min", "min_duty_cycle", tier=PollTier.SLOW),
+)
 
 
 class CresFan:
-    def __init__(self, reqAddr):
-        self.req = CresRequest(reqAddr)
+    def __init__(self, reqAddr, req=None):
+        self.req = req if req is not None else CresRequest(reqAddr)
+        self.compiler = QueryCompiler(self.req)
         self.enabled: bool = False
         self.duty_cycle: float = 0.0  
         self.min_duty_cycle: float = 0.0 
+        self.schema = PollSchema([("fan", "fan", FAN_FIELDS)])
 
 ## MULTI REQUESTS
-    async def getAllFanData(self):
-        """Fetch all Fan data with a single request."""
-        
-        response = await self.req._get_request(
-            "fan:enabled;fan:duty-cycle;fan:duty-cycle-min"
-        )
-
-       
-        if response is None or "error" in response.lower():
-            raise ValueError(f"Error fetching fan data: {response}")
-
-        
-        try:
-            enabled, duty_cycle, min_duty_cycle = response.split(";")
+    def poll_keys(self, tiers=ALL_TIERS):
+        """Return the fan keys of the given poll tiers."""
+        return self.schema.keys_for(tiers)
 
-            self.enabled = enabled == "1"
-            self.duty_cycle = float(duty_cycle) 
-            self.min_duty_cycle = float(min_duty_cycle)  
-        except ValueError as e:
+    def parse_poll(self, values):
+        """Parse the raw values by key answered for poll_keys()."""
+        data = {"fan": {}}
+        for key, raw in self.schema.parse(values, data):
+            _LOGGER.warning(f"Invalid fan value for {key}: {raw}")
 
-            raise ValueError(f"Error parsing fan data: {response}") from e
+        fan_state = data["fan"]
+        self.enabled = fan_state.get("enabled", self.enabled)
+        self.duty_cycle = fan_state.get("duty_cycle", self.duty_cycle)
+        self.min_duty_cycle = fan_state.get("min_duty_cycle", self.min_duty_cycle)
 
         return {
             "enabled": self.enabled,
@@ -37,29 +44,39 @@ class CresFan:
             "min_duty_cycle": self.min_duty_cycle,
         }
 
-    async def setAllFanData(self, enabled: bool, dutyCycle: float, dutyCycleMin: float):
-        """Set all Fan data with a single request."""
-
-        enabled_val = '1' if enabled else '0'
-        
+    async def getAllFanData(self):
+        """Fetch all Fan data with a single request."""
+        values = await self.compiler.fetch(self.schema.keys)
+        if not values:
+            raise ValueError("Error fetching fan data: no supported keys answered")
+        return self.parse_poll(values)
+
+    def write_values(self, enabled: bool, dutyCycle: float, dutyCycleMin: float = None):
+        """Return the keys and values that set the fan in one command.
+
+        The minimum duty cycle is left out if it is not given or the
+        firmware does not support it.
+        """
+        values = {
+            "fan:enabled": bool(enabled),
+            "fan:duty-cycle": float(dutyCycle),
+        }
+        if dutyCycleMin is not None and self.req.capabilities.is_supported("fan:duty-cycle-min"):
+            values["fan:duty-cycle-min"] = float(dutyCycleMin)
+        return values
 
+    async def setAllFanData(self, enabled: bool, dutyCycle: float, dutyCycleMin: float = None):
+        """Set all Fan data with a single request and parse the echoed values."""
+        values = self.write_values(enabled, dutyCycle, dutyCycleMin)
         response = await self.req._get_request(
-            f"fan:enabled={enabled_val};fan:duty-cycle={dutyCycle};fan:duty-cycle-min={dutyCycleMin}"
+            ";".join(f"{key}={format_write_value(value)}" for key, value in values.items())
         )
 
-
-        if response is None or "error" in response.lower():
+        parts = str(response).split(";") if response is not None else []
+        if len(parts) != len(values) or any(is_error_value(part) for part in parts):
             raise ValueError(f"Error setting fan data: {response}")
-        
-
-        await self.updateFanData()
 
-
-        return {
-            "enabled": self.enabled,
-            "duty_cycle": self.duty_cycle,
-            "min_duty_cycle": self.min_duty_cycle,
-        }
+        return self.parse_poll(dict(zip(values, parts)))
 
 ## SINGLE REQUESTS 
 
@@ -76,14 +93,13 @@ class CresFan:
 
     async def setFanEnabled(self, enabled: bool):
         """Enable or disable the fan. When disabling, set duty cycle to 0."""
-        endpoint = f"fan:enabled={'1' if enabled else '0'}"  # Ensure it's '1' or '0' as true/false
-        response = await self.req._get_request(endpoint)
-
-        if response:
-            self.enabled = enabled
-            if not self.enabled:  
-                await self.setFanDutyCycle(0)
-        return response
+        if enabled:
+            response = await self.req._get_request(f"fan:enabled={format_write_value(True)}")
+            if response:
+                self.enabled = True
+            return response
+        # Disabling sends the zero duty cycle in the same request
+        return await self.setAllFanData(False, 0)
 
     async def getFanDutyCycle(self):
         self.duty_cycle = float(await self.req._get_request("fan:duty-cycle")) 
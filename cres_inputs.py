@@ -1,9 +1,21 @@
 from .cres_req import CresRequest
+from .cres_query import QueryCompiler
+from .cres_schema import ALL_TIERS, Field, PollSchema, PollTier
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+INPUT_FIELDS = (
+    Field("voltage", "voltage"),
+    Field("calib-offset", "calibOffset", tier=PollTier.SLOW),
+    Field("calib-factor", "calibFactor", tier=PollTier.SLOW),
+)
 
 
 class CresInputs:
-    def __init__(self, reqAddr, inputList=["a", "b"]):
-        self.req = CresRequest(reqAddr)
+    def __init__(self, reqAddr, inputList=["a", "b"], req=None):
+        self.req = req if req is not None else CresRequest(reqAddr)
+        self.compiler = QueryCompiler(self.req)
         self.inputList = inputList
         self.inputs_data = {}
         self.devices = ["a", "b"]
@@ -14,52 +26,45 @@ class CresInputs:
                 "calibOffset": "",
                 "calibFactor": "",
             }
+        self.schema = self._build_schema()
 
-    def configureInputs(self, inputList):
+    def _build_schema(self):
+        return PollSchema(
+            (input_name, f"in-{input_name}", INPUT_FIELDS) for input_name in self.inputList
+        )
 
+    def configureInputs(self, inputList):
+        """Set the input channels to poll; channels kept keep their state."""
         self.inputList = inputList
+        self.devices = inputList
+        previous = self.inputs_data
+        self.inputs_data = {}
         for input_name in self.inputList:
-            self.inputs_data[input_name] = {+                      
+            self.inputs_data[input_name] = previous.get(input_name) or {
                 "voltage": 0,
                 "calibOffset": 0,
                 "calibFactor": 0,
             }
+        self.schema = self._build_schema()
 
 
 ## Multi Device Request
+    def poll_keys(self, tiers=ALL_TIERS):
+        """Return the input keys of the given poll tiers."""
+        return self.schema.keys_for(tiers)
+
+    def parse_poll(self, values):
+        """Parse the raw values by key answered for poll_keys()."""
+        for key, raw in self.schema.parse(values, self.inputs_data):
+            _LOGGER.warning(f"Invalid input value for {key}: {raw}")
+        return self.inputs_data
+
     async def getAllInputsData(self):
         """Fetch all input data with a single request for all inputs."""
-
-        request_string = ";".join([f"in-{input_name}:voltage;in-{input_name}:calib-offset;in-{input_name}:calib-factor" for input_name in self.inputList])
-        
-
-        response = await self.req._get_request(request_string)
-
-        if response is None or "error" in response.lower():
-            raise ValueError(f"Error fetching input data: {response}")
-
-
-        try:
-            split_response = response.split(";")
-            
-
-            for i, input_name in enumerate(self.inputList):
-                voltage = float(split_response[i * 3])
-                calibOffset = float(split_response[i * 3 + 1])
-                calibFactor = float(split_response[i * 3 + 2])
-
-
-                self.inputs_data[input_name] = {
-                    "voltage": voltage,
-                    "calibOffset": calibOffset,
-                    "calibFactor": calibFactor,
-                }
-
-        except ValueError as e:
-
-            raise ValueError(f"Error parsing input data: {response}") from e
-
-        return self.inputs_data
+        values = await self.compiler.fetch(self.schema.keys)
+        if not values:
+            raise ValueError("Error fetching input data: no supported keys answered")
+        return self.parse_poll(values)
 
 
 ## Single Device Request
@@ -102,20 +107,4 @@ class CresInputs:
 
     async def update_inputs(self):
         """Fetch all input data with a single request."""
-        for input_name in self.inputList:
-
-            response = await self.req._get_request(
-                f"in-{input_name}:voltage;in-{input_name}:calib-offset;in-{input_name}:calib-factor"
-            )
-
-
-            voltage, calibOffset, calibFactor = response.split(";")
-
-
-            self.inputs_data[input_name] = {
-                "voltage": float(voltage),
-                "calibOffset": float(calibOffset),
-                "calibFactor": float(calibFactor),
-            }
-
-        return self.inputs_data
\ No newline at end of file
+        return await self.getAllInputsData()
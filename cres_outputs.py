@@ -1,17 +1,33 @@
 from .cres_req import CresRequest
+from .cres_query import QueryCompiler
+from .cres_schema import ALL_TIERS, Field, FieldType, PollSchema, PollTier
 import logging
 
 _LOGGER = logging.getLogger(__name__)
 
+OUTPUT_FIELDS = (
+    Field("enabled", "enabled", FieldType.BOOL),
+    Field("voltage", "voltage"),
+    Field("calib-offset", "calibOffset", tier=PollTier.SLOW),
+    Field("calib-factor", "calibFactor", tier=PollTier.SLOW),
+    Field("threshold", "threshold", tier=PollTier.SLOW),
+)
+
+OUTPUT_PWM_FIELDS = (
+    Field("pwm-enabled", "pwmEnabled", FieldType.BOOL),
+    Field("pwm-frequency", "pwmFrequency", tier=PollTier.SLOW),
+)
+
 class CresOutputs:
     def __init__(
         self,
         reqAddr,
         outputList=["a", "b", "c", "d", "e", "f"],
         pwm_devices=["a", "b"],
-        
+        req=None,
     ):
-        self.req = CresRequest(reqAddr)
+        self.req = req if req is not None else CresRequest(reqAddr)
+        self.compiler = QueryCompiler(self.req)
         self.outputList = outputList
         self.devices = outputList
         self.outputs_data = {}
@@ -26,55 +42,50 @@ class CresOutputs:
                 "pwmFrequency": 0 if output_name in self.isPWM else None,
                 "threshold": 0,
             }
+        self.schema = self._build_schema()
+
+    def _build_schema(self):
+        return PollSchema(
+            (
+                output_name,
+                f"out-{output_name}",
+                OUTPUT_FIELDS + (OUTPUT_PWM_FIELDS if output_name in self.isPWM else ()),
+            )
+            for output_name in self.outputList
+        )
 
-# Multi Deviec Request 
-    async def getAllOutputsData(self):
-        """Fetch all output data with a single request for all outputs."""
-
-        request_parts = []
+    def configurePWM(self, pwm_devices):
+        """Set which outputs support PWM, e.g. from a capability probe."""
+        self.isPWM = pwm_devices
         for output_name in self.outputList:
-            request_parts.append(
-                f"out-{output_name}:enabled;out-{output_name}:voltage;out-{output_name}:calib-offset;out-{output_name}:calib-factor;out-{output_name}:threshold"
-            )
+            output_data = self.outputs_data[output_name]
             if output_name in self.isPWM:
-                request_parts.append(
-                    f"out-{output_name}:pwm-enabled;out-{output_name}:pwm-frequency"
-                )
-
-
-        request_string = ";".join(request_parts)
-
-
-        response = await self.req._get_request(request_string)
-
-  
-        if response is None or "error" in response.lower():
-            raise ValueError(f"Error fetching output data: {response}")
-
-    
-        try:
-            split_response = response.split(";")
-            index = 0
-            for output_name in self.outputList:
-                self.outputs_data[output_name]["enabled"] = str(split_response[index]).strip() == "1"
-                self.outputs_data[output_name]["voltage"] = float(split_response[index + 1])
-                self.outputs_data[output_name]["calibOffset"] = float(split_response[index + 2])
-                self.outputs_data[output_name]["calibFactor"] = float(split_response[index + 3])
-                self.outputs_data[output_name]["threshold"] = float(split_response[index + 4])
-                index += 5
-                
-                
-                if output_name in self.isPWM:
-                    self.outputs_data[output_name]["pwmEnabled"] = str(split_response[index]).strip() == "1"
-                    self.outputs_data[output_name]["pwmFrequency"] = float(split_response[index + 1])
-                    index += 2
-
-        except ValueError as e:
-           
-            raise ValueError(f"Error parsing output data: {response}") from e
+                if output_data["pwmEnabled"] is None:
+                    output_data["pwmEnabled"] = False
+                    output_data["pwmFrequency"] = 0
+            else:
+                output_data["pwmEnabled"] = None
+                output_data["pwmFrequency"] = None
+        self.schema = self._build_schema()
 
+# Multi Deviec Request 
+    def poll_keys(self, tiers=ALL_TIERS):
+        """Return the output keys of the given poll tiers."""
+        return self.schema.keys_for(tiers)
+
+    def parse_poll(self, values):
+        """Parse the raw values by key answered for poll_keys()."""
+        for key, raw in self.schema.parse(values, self.outputs_data):
+            _LOGGER.warning(f"Invalid output value for {key}: {raw}")
         return self.outputs_data
 
+    async def getAllOutputsData(self):
+        """Fetch all output data with a single request for all outputs."""
+        values = await self.compiler.fetch(self.schema.keys)
+        if not values:
+            raise ValueError("Error fetching output data: no supported keys answered")
+        return self.parse_poll(values)
+
 ## Single Device Request
 
     async def get_output_enabled(self, output_name):
@@ -0,0 +1,76 @@
+"""Validation of profiles for the apply_profile service."""
+from .number import NUMBER_RANGES
+
+# Writable on/off fields by channel kind
+BOOL_FIELDS = {
+    "fan": ("enabled",),
+    "out": ("enabled", "pwm-enabled"),
+    "switch": ("enabled", "pwm-enabled"),
+}
+
+# Fields that only exist on outputs with PWM
+OUTPUT_PWM_FIELDS = ("pwm-enabled", "pwm-frequency")
+
+
+def _channel_kind(controller, channel):
+    """Return (kind, name) of a channel like `out-a`, or raise ValueError."""
+    if channel == "fan":
+        return "fan", None
+    kind, _, name = channel.partition("-")
+    channels = {
+        "in": controller.inputs.devices,
+        "out": controller.outputs.devices,
+        "switch": controller.switches.devices,
+    }.get(kind)
+    if channels is None or name not in channels:
+        raise ValueError(f"unknown channel {channel}")
+    return kind, name
+
+
+def _coerce_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in ("1", "true", "on"):
+        return True
+    if isinstance(value, str) and value.strip().lower() in ("0", "false", "off"):
+        return False
+    raise ValueError(f"expected on/off, got {value!r}")
+
+
+def _coerce_number(value, low, high):
+    if isinstance(value, bool):
+        raise ValueError(f"expected a number, got {value!r}")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"expected a number, got {value!r}") from None
+    if not low <= number <= high:
+        raise ValueError(f"{number:g} outside {low}..{high}")
+    return number
+
+
+def validate_profile(controller, profile):
+    """Check a mapping of device keys to values against the channels and ranges.
+
+    Returns (writes, errors): the coerced values to write by key and an
+    error message for every key that was left out.
+    """
+    writes = {}
+    errors = {}
+    for key, value in profile.items():
+        try:
+            channel, _, field = key.partition(":")
+            kind, name = _channel_kind(controller, channel)
+            if kind == "out" and field in OUTPUT_PWM_FIELDS and name not in controller.outputs.isPWM:
+                raise ValueError(f"output {name} has no PWM")
+            if field in BOOL_FIELDS.get(kind, ()):
+                writes[key] = _coerce_bool(value)
+            elif (kind, field) in NUMBER_RANGES:
+                writes[key] = _coerce_number(value, *NUMBER_RANGES[(kind, field)])
+            else:
+                raise ValueError(f"{key} is not writable")
+        except ValueError as e:
+            errors[key] = str(e)
+    return writes, errors
@@ -0,0 +1,150 @@
+from .const import QUERY_MAX_URL_LENGTH
+from .cres_req import ResponseTooLarge
+import aiohttp
+import asyncio
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+QUERY_PATH = "/command?query="
+
+
+class QueryRejected(Exception):
+    """The controller answered, but not with one value per key."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def is_error_value(raw):
+    return "error" in raw.lower()
+
+
+class QueryCompiler:
+    """Merge the keys of a poll cycle into as few requests as possible.
+
+    Keys the controller rejects are isolated by bisecting the failing batch,
+    recorded in the request's capability cache and left out of later batches.
+    A batch whose answer is too large for the controller is bisected too.
+    """
+
+    def __init__(self, req, max_url_length=QUERY_MAX_URL_LENGTH):
+        self.req = req
+        self.max_url_length = max_url_length
+        self.capabilities = req.capabilities
+
+    def compile(self, keys):
+        """Split keys into batches whose `;`-joined query fits the URL budget."""
+        budget = self.max_url_length - len(QUERY_PATH)
+        batches = []
+        current = []
+        length = 0
+        for key in keys:
+            extra = len(key) + (1 if current else 0)
+            if current and length + extra > budget:
+                batches.append(current)
+                current = []
+                length = 0
+                extra = len(key)
+            current.append(key)
+            length += extra
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _query(self, batch):
+        try:
+            response = await self.req._get_request(";".join(batch))
+        except aiohttp.ClientResponseError as e:
+            # An oversized answer is rejected like an unsupported key, so the
+            # batch is bisected instead of retried
+            if 400 <= e.status < 500 or isinstance(e, ResponseTooLarge):
+                raise QueryRejected(f"Status {e.status} for {batch}", e.status) from e
+            raise
+        if response is None:
+            raise QueryRejected(f"No response for {batch}")
+        parts = str(response).split(";")
+        if len(parts) != len(batch):
+            raise QueryRejected(f"Expected {len(batch)} values but got {len(parts)}: {response}")
+        return parts
+
+    async def _fetch_batch(self, batch, values):
+        try:
+            parts = await self._query(batch)
+        except QueryRejected as e:
+            if len(batch) == 1:
+                _LOGGER.debug(f"Key {batch[0]} abgelehnt: {e}")
+                self.capabilities.mark_unsupported(batch[0])
+                return
+            middle = len(batch) // 2
+            await self._gather(
+                self._fetch_batch(batch[:middle], values),
+                self._fetch_batch(batch[middle:], values),
+            )
+            return
+
+        for key, raw in zip(batch, parts):
+            if is_error_value(raw):
+                self.capabilities.mark_unsupported(key)
+            else:
+                values[key] = raw
+
+    @staticmethod
+    async def _gather(*fetches):
+        # Let every batch finish before raising, so none fails unobserved
+        results = await asyncio.gather(*fetches, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def fetch(self, keys):
+        """Fetch all supported keys and return their raw values by key.
+
+        Batches run concurrently, as many at a time as the request allows
+        for the host; each merges its values as soon as it is answered.
+        """
+        values = {}
+        try:
+            await self._gather(
+                *(self._fetch_batch(batch, values) for batch in self.compile(self.capabilities.filter(keys)))
+            )
+        finally:
+            self.capabilities.record_answered(values)
+        return values
+
+    async def confirm_rejected(self, keys, values):
+        """Ask for each key on its own and return the ones the controller rejects.
+
+        Only a 4xx or an error value counts as a rejection. Keys that answer
+        are added to `values`; keys that fail otherwise, e.g. on a timeout,
+        are neither.
+        """
+        async def check(key):
+            try:
+                parts = await self._query([key])
+            except QueryRejected as e:
+                return e.status is not None and 400 <= e.status < 500
+            except Exception as e:
+                _LOGGER.debug(f"Key {key} nicht geprüft: {e}")
+                return False
+            if is_error_value(parts[0]):
+                return True
+            self.capabilities.mark_supported(key)
+            values[key] = parts[0]
+            return False
+
+        results = await asyncio.gather(*(check(key) for key in keys))
+        return {key for key, rejected in zip(keys, results) if rejected}
+
+    async def fetch_groups(self, groups):
+        """Fetch several (keys, parser) groups at once and hand each parser the values."""
+        keys = [key for group_keys, _ in groups for key in group_keys]
+        values = await self.fetch(keys)
+
+        for group_keys, parser in groups:
+            try:
+                parser(values)
+            except Exception as e:
+                _LOGGER.error(f"Fehler beim Verarbeiten der Antwort für {group_keys}: {e}")
+        return values
@@ -1,41 +1,248 @@
+from functools import partial
 import aiohttp
+import asyncio
+import contextlib
 import logging
+import random
+import time
+
+from .cres_breaker import CircuitBreaker, CircuitOpenError
+from .cres_capabilities import CresCapabilities
+from .cres_stats import RequestStats
+from .const import (
+    DEFAULT_READ_CACHE_TTL,
+    HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_LIMIT_PER_HOST,
+    READ_RETRIES,
+    REQUEST_TIMEOUT_FACTOR,
+    REQUEST_TIMEOUT_MAX,
+    REQUEST_TIMEOUT_MIN,
+    RETRY_BACKOFF,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+# Error the controller answers with (status 500) when a query's values do
+# not fit its response buffer
+RESPONSE_TOO_LARGE = "response-too-large"
+
+
+class ResponseTooLarge(aiohttp.ClientResponseError):
+    """The controller refused a query because its answer would be too large."""
+
+
+class CresSession:
+    """Keep-alive connection pool shared by all requests to a CresControl."""
+
+    def __init__(self, limit_per_host=HTTP_LIMIT_PER_HOST, keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT):
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._session = None
+
+    def get_session(self):
+        """Return the pooled session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def close(self):
+        """Close the pooled session and all of its connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+def _is_transient(error):
+    """Return True for failures a retry of the same read may not hit again."""
+    if isinstance(error, (CircuitOpenError, ResponseTooLarge)):
+        return False
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500
+    return isinstance(error, (aiohttp.ClientConnectionError, asyncio.TimeoutError))
+
 
 class CresRequest:
-    def __init__(self, reqAddr):
+    def __init__(self, reqAddr, session=None, cache_ttl=DEFAULT_READ_CACHE_TTL, limiter=None):
         self.reqAddr = reqAddr
+        self._owns_session = session is None
+        self.session = session if session is not None else CresSession()
+        # Keys this host does not answer, shared by every QueryCompiler on it
+        self.capabilities = CresCapabilities()
+        self.stats = RequestStats()
+        self.breaker = CircuitBreaker(reqAddr)
+        self._timeout = None
+        # Requests in flight to this host, bounded like its connection pool.
+        # Waiting for a slot happens before the request timeout starts.
+        self._slots = asyncio.Semaphore(self.session.limit_per_host)
+        # Optional semaphore shared with other hosts, e.g. the poll scheduler's
+        self.limiter = limiter
+        self._write_listeners = []
+        # Single-flight reads: identical queries in flight share one request,
+        # answers are served again for cache_ttl seconds. Writes bump the
+        # generation so nothing read before them is handed out afterwards.
+        self.cache_ttl = cache_ttl
+        self._pending = {}
+        self._cache = {}
+        self._generation = 0
+
+    def add_write_listener(self, listener):
+        """Call listener(keys) after every request that writes `key=value` pairs.
+
+        Returns a callable that removes the listener again.
+        """
+        self._write_listeners.append(listener)
+        return lambda: self._write_listeners.remove(listener)
+
+    def _notify_write(self, endpoint):
+        keys = [part.split("=", 1)[0] for part in endpoint.split(";") if "=" in part]
+        for listener in list(self._write_listeners):
+            listener(keys)
+
+    def request_timeout(self):
+        """Seconds a request may take, derived from the recent p95 latency."""
+        # Sorting the window on every request is wasted work, refresh now and then
+        if self._timeout is None or self.stats.total_requests % 16 == 0:
+            p95 = self.stats.latency_percentile(95)
+            if p95 is None:
+                self._timeout = REQUEST_TIMEOUT_MAX
+            else:
+                self._timeout = min(
+                    REQUEST_TIMEOUT_MAX,
+                    max(REQUEST_TIMEOUT_MIN, p95 / 1000 * REQUEST_TIMEOUT_FACTOR),
+                )
+        return self._timeout
+
+    def invalidate_reads(self):
+        """Drop cached answers and stop joining reads already in flight."""
+        self._generation += 1
+        self._cache.clear()
+        self._pending.clear()
 
     async def _get_request(self, endpoint):
+        if "=" in endpoint:
+            self.invalidate_reads()
+            try:
+                return await self._request(endpoint)
+            finally:
+                self.invalidate_reads()
+
+        cached = self._cache.get(endpoint)
+        if cached is not None and time.monotonic() - cached[0] < self.cache_ttl:
+            self.stats.cache_hits += 1
+            return cached[1]
+
+        pending = self._pending.get(endpoint)
+        if pending is None:
+            pending = asyncio.ensure_future(self._request(endpoint))
+            pending.add_done_callback(partial(self._read_done, endpoint, self._generation))
+            self._pending[endpoint] = pending
+        else:
+            self.stats.coalesced += 1
+        # A cancelled caller must not cancel the request others wait for
+        return await asyncio.shield(pending)
+
+    def _read_done(self, endpoint, generation, task):
+        if self._pending.get(endpoint) is task:
+            del self._pending[endpoint]
+        if task.cancelled() or task.exception() is not None:
+            return
+        if self.cache_ttl and generation == self._generation:
+            now = time.monotonic()
+            if len(self._cache) > 64:
+                self._cache = {
+                    key: entry for key, entry in self._cache.items() if now - entry[0] < self.cache_ttl
+                }
+            self._cache[endpoint] = (now, task.result())
+
+    async def _request(self, endpoint):
         url = f"http://{self.reqAddr}/command?query={endpoint}"
-        print(url)
         _LOGGER.debug(f"GET Request URL: {url}")
+        # Reads are idempotent and retried with jitter, writes are sent once
+        attempts = 1 if "=" in endpoint else READ_RETRIES + 1
+        for attempt in range(attempts):
+            try:
+                async with self._slots, self.limiter or contextlib.nullcontext():
+                    self.breaker.before_request()
+                    return await self._send(endpoint, url)
+            except Exception as e:
+                if attempt + 1 == attempts or not _is_transient(e):
+                    raise
+                delay = random.uniform(0, RETRY_BACKOFF * 2**attempt)
+                _LOGGER.debug(f"Wiederhole {url} in {delay:.2f}s nach {type(e).__name__}")
+                await asyncio.sleep(delay)
+
+    async def _send(self, endpoint, url):
+        start = time.perf_counter()
+        status = None
+        response_bytes = 0
+        error = None
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    content_type = response.headers.get("Content-Type")
-                    if response.status == 200:
-                        if content_type and "application/json" in content_type:
-                            result = await response.json()
-                            _LOGGER.debug(f"GET Response: {result}")
-                            return result
-                        elif content_type and "text/plain" in content_type:
-                            content = await response.text()
-                            _LOGGER.debug(f"GET Response (text/plain): {content}")
-                            return content
-                        else:
-                            content = await response.text()
-                            _LOGGER.error(
-                                f"GET Request failed with unexpected content type: {content_type}. Response text: {content}"
-                            )
-                            raise ValueError(f"Unexpected content type: {content_type}")
+            session = self.session.get_session()
+            timeout = aiohttp.ClientTimeout(total=self.request_timeout())
+            async with session.get(url, timeout=timeout) as response:
+                status = response.status
+                content_type = response.headers.get("Content-Type")
+                response_bytes = len(await response.read())
+                if response.status == 200:
+                    if content_type and "application/json" in content_type:
+                        result = await response.json()
+                        _LOGGER.debug(f"GET Response: {result}")
+                    elif content_type and "text/plain" in content_type:
+                        result = await response.text()
+                        _LOGGER.debug(f"GET Response (text/plain): {result}")
                     else:
+                        content = await response.text()
                         _LOGGER.error(
-                            f"GET Request failed with status {response.status}"
+                            f"GET Request failed with unexpected content type: {content_type}. Response text: {content}"
                         )
-                        response.raise_for_status()
+                        raise ValueError(f"Unexpected content type: {content_type}")
+                    self.breaker.record_success()
+                    if self._write_listeners and "=" in endpoint:
+                        self._notify_write(endpoint)
+                    return result
+                else:
+                    text = await response.text()
+                    _LOGGER.error(
+                        f"GET Request failed with status {response.status}: {text}"
+                    )
+                    if RESPONSE_TOO_LARGE in text:
+                        # Retrying the same query cannot help, a smaller one can
+                        raise ResponseTooLarge(
+                            response.request_info,
+                            response.history,
+                            status=response.status,
+                            message=text,
+                            headers=response.headers,
+                        )
+                    response.raise_for_status()
+        except asyncio.CancelledError:
+            error = "CancelledError"
+            self.breaker.release()
+            raise
         except Exception as e:
-            _LOGGER.error(f"GET Request failed: {e}")
+            error = type(e).__name__
+            if _is_transient(e):
+                self.breaker.record_failure()
+            else:
+                # The controller answered, it is only the request it did not like
+                self.breaker.record_success()
+            _LOGGER.error(f"GET Request failed: {e!r}")
             raise
+        finally:
+            self.stats.record(
+                endpoint.count(";") + 1,
+                len(url),
+                response_bytes,
+                time.perf_counter() - start,
+                status,
+                error,
+            )
+
+    async def close(self):
+        """Close the session if this request created it."""
+        if self._owns_session:
+            await self.session.close()
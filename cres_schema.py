@@ -0,0 +1,119 @@
+from dataclasses import dataclass
+from enum import StrEnum
+import time
+
+
+class FieldType(StrEnum):
+    BOOL = "bool"
+    FLOAT = "float"
+    STRING = "string"
+
+
+class PollTier(StrEnum):
+    # Live readings and on/off states, read every cycle
+    FAST = "fast"
+    # Calibration and configuration, read rarely and after writes
+    SLOW = "slow"
+
+
+ALL_TIERS = frozenset(PollTier)
+
+
+_BOOL_VALUES = {"1": True, "0": False, "true": True, "false": False}
+
+
+def _parse_bool(raw):
+    return _BOOL_VALUES[raw.strip().lower()]
+
+
+def _parse_float(raw):
+    return float(raw)
+
+
+def _parse_string(raw):
+    return raw
+
+
+_CONVERTERS = {
+    FieldType.BOOL: _parse_bool,
+    FieldType.FLOAT: _parse_float,
+    FieldType.STRING: _parse_string,
+}
+
+
+@dataclass(frozen=True)
+class Field:
+    """A single value of a channel, e.g. `calib-offset` stored as `calibOffset`."""
+
+    key: str
+    attr: str
+    type: FieldType = FieldType.FLOAT
+    # Sensors answer an empty value while they warm up; keep the last reading then
+    skip_empty: bool = False
+    tier: PollTier = PollTier.FAST
+
+
+class PollSchema:
+    """Query keys and a precompiled parser for a list of channels.
+
+    `channels` is an iterable of (channel, key prefix, fields), for example
+    ("a", "out-a", OUTPUT_FIELDS). The keys and converters are resolved once,
+    so parsing a poll is a single pass over the answered values.
+    """
+
+    def __init__(self, channels):
+        channels = tuple(channels)
+        self._entries = tuple(
+            (f"{prefix}:{field.key}", channel, field.attr, _CONVERTERS[field.type], field.skip_empty)
+            for channel, prefix, fields in channels
+            for field in fields
+        )
+        self.keys = tuple(entry[0] for entry in self._entries)
+        self.query = ";".join(self.keys)
+        self.tiers = {
+            f"{prefix}:{field.key}": field.tier
+            for channel, prefix, fields in channels
+            for field in fields
+        }
+        self._keys_by_tiers = {ALL_TIERS: self.keys}
+        # channel -> field key -> device key, for refreshing single channels
+        self._channel_keys = {
+            channel: {field.key: f"{prefix}:{field.key}" for field in fields}
+            for channel, prefix, fields in channels
+        }
+        self.last_parse_time = 0.0
+
+    def keys_for(self, tiers=ALL_TIERS):
+        """Return the keys of the given poll tiers, cached per tier set."""
+        tiers = frozenset(tiers)
+        keys = self._keys_by_tiers.get(tiers)
+        if keys is None:
+            keys = tuple(key for key in self.keys if self.tiers[key] in tiers)
+            self._keys_by_tiers[tiers] = keys
+        return keys
+
+    def keys_of(self, channel, fields=None):
+        """Return the keys of one channel, optionally only of the given field keys."""
+        channel_keys = self._channel_keys.get(channel, {})
+        if fields is None:
+            return tuple(channel_keys.values())
+        return tuple(channel_keys[field] for field in fields if field in channel_keys)
+
+    def parse(self, values, data):
+        """Decode raw values by key into data[channel][attr].
+
+        Keys missing from `values` (unsupported or not requested) are skipped.
+        Returns a list of (key, raw value) pairs that could not be decoded.
+        """
+        start = time.perf_counter()
+        errors = []
+        for key, channel, attr, convert, skip_empty in self._entries:
+            raw = values.get(key)
+            if raw is None or (skip_empty and raw == ""):
+                continue
+            try:
+                data[channel][attr] = convert(raw)
+            except (ValueError, KeyError):
+                errors.append((key, raw))
+        self.last_parse_time = time.perf_counter() - start
+        return errors
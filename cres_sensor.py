@@ -1,14 +1,26 @@
 from .cres_req import CresRequest
+from .cres_query import QueryCompiler
+from .cres_schema import ALL_TIERS, Field, PollSchema
 import logging
 
 _LOGGER = logging.getLogger(__name__)
 
+SENSOR_FIELDS = (
+    Field("humidity", "humidity", skip_empty=True),
+    Field("temperature", "temperature", skip_empty=True),
+    Field("vpd", "vpd", skip_empty=True),
+)
+
+SENSOR_CO2_FIELDS = (Field("co2-concentration", "co2", skip_empty=True),)
+
 
 class CresSensors:
-    def __init__(self, reqAddr):
-        self.req = CresRequest(reqAddr)
+    def __init__(self, reqAddr, req=None):
+        self.req = req if req is not None else CresRequest(reqAddr)
+        self.compiler = QueryCompiler(self.req)
         self.sensors = []
         self.sensor_data = {} 
+        self.schema = PollSchema([])
 
     async def get_sensors(self):
         """Fetch the list of sensors."""
@@ -16,49 +28,48 @@ class CresSensors:
 
         sensor_ids = sensor_data.strip("[]").replace('"', "").split(",") 
 
-        self.sensors = sensor_ids if isinstance(sensor_ids, list) else [sensor_ids]
+        return self.set_sensors(sensor_ids if isinstance(sensor_ids, list) else [sensor_ids])
+
+    def set_sensors(self, sensor_ids):
+        """Use the given extension ids, e.g. restored from a snapshot."""
+        self.sensors = list(sensor_ids)
+        self.schema = PollSchema(self.sensor_channel(sensor_id) for sensor_id in self.sensors)
+        self.sensor_data = {sensor_id: self.sensor_data.get(sensor_id, {}) for sensor_id in self.sensors}
 
         return self.sensors
 
-    async def update_sensor_data(self):
-        """Update sensor data by fetching all relevant data in one pass."""
-        self.sensor_data = {}  
+    def sensor_channel(self, sensor_id):
+        # CO2 is requested from every extension; the capability cache drops it
+        # for sensors that do not answer it
+        return (sensor_id, f"extension:{sensor_id}", SENSOR_FIELDS + SENSOR_CO2_FIELDS)
 
-        for sensor_id in self.sensors:
-            try:
-                sensor_state = await self.fetch_all_sensor_data(sensor_id)
-                self.sensor_data[sensor_id] = sensor_state
+    def poll_keys(self, tiers=ALL_TIERS):
+        """Return the sensor keys of the given poll tiers."""
+        return self.schema.keys_for(tiers)
 
-            except Exception as e:
-                _LOGGER.error(
-                    f"Fehler beim Abrufen oder Verarbeiten der Sensordaten für Sensor {sensor_id}: {e}"
-                )
+    def parse_poll(self, values):
+        """Parse the raw values by key answered for poll_keys()."""
+        for key, raw in self.schema.parse(values, self.sensor_data):
+            _LOGGER.error(
+                f"Fehler beim Abrufen oder Verarbeiten der Sensordaten für {key}: {raw}"
+            )
+
+        return self.sensor_data
+
+    async def update_sensor_data(self):
+        """Update sensor data by fetching all sensors in one pass."""
+        values = await self.compiler.fetch(self.poll_keys())
+        return self.parse_poll(values)
 
     async def fetch_all_sensor_data(self, sensor_id):
         """Fetch all data for a specific sensor in a single API request."""
         sensor_state = {}
         try:
-
-            response = await self.req._get_request(
-                f"extension:{sensor_id}:humidity;extension:{sensor_id}:temperature;extension:{sensor_id}:vpd"
-                + (f";extension:{sensor_id}:co2-concentration" if "co2" in sensor_id.lower() else "")
-            )
-
-
-            values = response.split(";")
-            humidity, temperature, vpd = values[0], values[1], values[2]
-
-            if humidity:
-                sensor_state["humidity"] = float(humidity)
-            if temperature:
-                sensor_state["temperature"] = float(temperature)
-            if vpd:
-                sensor_state["vpd"] = float(vpd)
-
-            if "co2" in sensor_id.lower() and len(values) > 3:
-                co2 = values[3]
-                if co2:
-                    sensor_state["co2"] = float(co2)
+            schema = PollSchema([self.sensor_channel(sensor_id)])
+            values = await self.compiler.fetch(schema.keys)
+            data = {sensor_id: sensor_state}
+            for key, raw in schema.parse(values, data):
+                _LOGGER.error(f"Ungültiger Wert für {key}: {raw}")
 
         except Exception as e:
             _LOGGER.error(
@@ -0,0 +1,123 @@
+from collections import deque
+from dataclasses import dataclass
+from .const import REQUEST_STATS_MAX_SAMPLES, REQUEST_STATS_WINDOW
+import bisect
+import time
+
+# Upper bucket edges of the rolling histograms; the last bucket is open
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+URL_LENGTH_BUCKETS = (64, 128, 256, 512, 1024, 2048)
+RESPONSE_BYTES_BUCKETS = (16, 64, 256, 1024, 4096)
+KEY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50)
+
+
+@dataclass(frozen=True)
+class RequestSample:
+    """One HTTP request to a controller."""
+
+    time: float
+    keys: int
+    url_length: int
+    response_bytes: int
+    latency: float
+    status: int | None
+    error: str | None
+
+
+def _histogram(values, edges):
+    counts = [0] * (len(edges) + 1)
+    for value in values:
+        counts[bisect.bisect_left(edges, value)] += 1
+    labels = [f"<={edge}" for edge in edges] + [f">{edges[-1]}"]
+    return dict(zip(labels, counts))
+
+
+def _percentile(ordered, percent):
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class RequestStats:
+    """Rolling window of request samples for one controller."""
+
+    def __init__(self, window=REQUEST_STATS_WINDOW, max_samples=REQUEST_STATS_MAX_SAMPLES):
+        self.window = window
+        self.samples = deque(maxlen=max_samples)
+        self.total_requests = 0
+        self.total_errors = 0
+        # Reads answered without a request of their own
+        self.coalesced = 0
+        self.cache_hits = 0
+
+    def record(self, keys, url_length, response_bytes, latency, status=None, error=None):
+        self.total_requests += 1
+        if error is not None:
+            self.total_errors += 1
+        self.samples.append(
+            RequestSample(time.monotonic(), keys, url_length, response_bytes, latency, status, error)
+        )
+
+    def recent(self):
+        """Return the samples inside the window, dropping older ones."""
+        cutoff = time.monotonic() - self.window
+        samples = self.samples
+        while samples and samples[0].time < cutoff:
+            samples.popleft()
+        return samples
+
+    def latency_percentile(self, percent):
+        """Latency in milliseconds of successful requests, None without samples."""
+        ordered = sorted(sample.latency for sample in self.recent() if sample.error is None)
+        value = _percentile(ordered, percent)
+        return None if value is None else value * 1000
+
+    def error_rate(self):
+        """Share of failed requests in the window in percent."""
+        samples = self.recent()
+        if not samples:
+            return None
+        return 100 * sum(1 for sample in samples if sample.error is not None) / len(samples)
+
+    def requests_per_minute(self):
+        samples = self.recent()
+        if not samples:
+            return 0.0
+        # Before the window has filled up, rate over the time actually covered
+        span = min(self.window, max(time.monotonic() - samples[0].time, 60))
+        return len(samples) * 60 / span
+
+    def as_dict(self):
+        """Summary and histograms of the window, e.g. for diagnostics."""
+        samples = self.recent()
+        errors = {}
+        statuses = {}
+        for sample in samples:
+            if sample.error is not None:
+                errors[sample.error] = errors.get(sample.error, 0) + 1
+            if sample.status is not None:
+                statuses[str(sample.status)] = statuses.get(str(sample.status), 0) + 1
+        return {
+            "window_seconds": self.window,
+            "requests": len(samples),
+            "total_requests": self.total_requests,
+            "total_errors": self.total_errors,
+            "coalesced": self.coalesced,
+            "cache_hits": self.cache_hits,
+            "requests_per_minute": self.requests_per_minute(),
+            "error_rate": self.error_rate(),
+            "latency_ms": {
+                "p50": self.latency_percentile(50),
+                "p95": self.latency_percentile(95),
+                "p99": self.latency_percentile(99),
+            },
+            "errors": errors,
+            "statuses": statuses,
+            "histograms": {
+                "latency_ms": _histogram((s.latency * 1000 for s in samples), LATENCY_BUCKETS_MS),
+                "url_length": _histogram((s.url_length for s in samples), URL_LENGTH_BUCKETS),
+                "response_bytes": _histogram((s.response_bytes for s in samples), RESPONSE_BYTES_BUCKETS),
+                "keys": _histogram((s.keys for s in samples), KEY_COUNT_BUCKETS),
+            },
+        }
@@ -1,68 +1,62 @@
 from .cres_req import CresRequest
+from .cres_query import QueryCompiler
+from .cres_schema import ALL_TIERS, Field, FieldType, PollSchema, PollTier
 import logging
 
 _LOGGER = logging.getLogger(__name__)
 
+SWITCH_FIELDS = (
+    Field("enabled", "enabled", FieldType.BOOL),
+    Field("pwm-enabled", "pwm-enabled", FieldType.BOOL),
+    Field("duty-cycle", "duty-cycle"),
+    Field("pwm-frequency", "pwm-frequency", tier=PollTier.SLOW),
+)
+
 class CresSwitches:
-    def __init__(self, reqAddr, switchList=["12v", "24v-a", "24v-b"]):
-        self.req = CresRequest(reqAddr)
+    def __init__(self, reqAddr, switchList=["12v", "24v-a", "24v-b"], req=None):
+        self.req = req if req is not None else CresRequest(reqAddr)
+        self.compiler = QueryCompiler(self.req)
+        self.switch_data = {}
+        self.configureSwitches(switchList)
+
+    def configureSwitches(self, switchList):
+        """Set the switch channels to poll, e.g. from a capability probe.
+
+        Channels that stay keep their state, e.g. values restored from a
+        snapshot.
+        """
         self.switchList = switchList
         self.devices = switchList
+        previous = self.switch_data
         self.switch_data = {}
-        
         for switch_name in self.devices:
-            self.switch_data[switch_name] = {
+            self.switch_data[switch_name] = previous.get(switch_name) or {
                 "enabled": False,
                 "pwm-enabled": False, 
                 "duty-cycle": 0.0,
                 "pwm-frequency": 0.0,
             }
+        self.schema = PollSchema(
+            (switch_name, f"switch-{switch_name}", SWITCH_FIELDS) for switch_name in self.switchList
+        )
 
     ## Multi Device Request
+    def poll_keys(self, tiers=ALL_TIERS):
+        """Return the switch keys of the given poll tiers."""
+        return self.schema.keys_for(tiers)
+
+    def parse_poll(self, values):
+        """Parse the raw values by key answered for poll_keys()."""
+        for key, raw in self.schema.parse(values, self.switch_data):
+            _LOGGER.warning(f"Invalid switch value for {key}: {raw}")
+        return self.switch_data
+
     async def getAllSwitchData(self):
         """Fetch all switch data with a single request."""
-
-        response = await self.req._get_request(
-            "switch-12v:enabled;switch-12v:pwm-enabled;switch-12v:duty-cycle;switch-12v:pwm-frequency;"
-            "switch-24v-a:enabled;switch-24v-a:pwm-enabled;switch-24v-a:duty-cycle;switch-24v-a:pwm-frequency;"
-            "switch-24v-b:enabled;switch-24v-b:pwm-enabled;switch-24v-b:duty-cycle;switch-24v-b:pwm-frequency"
-        )
-
-
-        if response is None or "error" in response.lower():
-            raise ValueError(f"Error fetching switch data: {response}")
-
- 
-        try:
-            (
-                enabled_12v, enabled_pwm_12v, duty_cycle_12v, pwm_frequency_12v,
-                enabled_24v_a, enabled_pwm_24v_a, duty_cycle_24v_a, pwm_frequency_24v_a,
-                enabled_24v_b, enabled_pwm_24v_b, duty_cycle_24v_b, pwm_frequency_24v_b
-            ) = response.split(";")
-            
-           
-            self.switch_data["12v"]["enabled"] = enabled_12v == "1"
-            self.switch_data["12v"]["pwm-enabled"] = enabled_pwm_12v == "1"
-            self.switch_data["12v"]["duty-cycle"] = float(duty_cycle_12v)
-            self.switch_data["12v"]["pwm-frequency"] = float(pwm_frequency_12v)
-
-           
-            self.switch_data["24v-a"]["enabled"] = enabled_24v_a == "1"
-            self.switch_data["24v-a"]["pwm-enabled"] = enabled_pwm_24v_a == "1"
-            self.switch_data["24v-a"]["duty-cycle"] = float(duty_cycle_24v_a)
-            self.switch_data["24v-a"]["pwm-frequency"] = float(pwm_frequency_24v_a)
-
-           
-            self.switch_data["24v-b"]["enabled"] = enabled_24v_b == "1"
-            self.switch_data["24v-b"]["pwm-enabled"] = enabled_pwm_24v_b == "1"
-            self.switch_data["24v-b"]["duty-cycle"] = float(duty_cycle_24v_b)
-            self.switch_data["24v-b"]["pwm-frequency"] = float(pwm_frequency_24v_b)
-
-        except ValueError as e:
-            
-            raise ValueError(f"Error parsing switch data: {response}") from e
-
-        return self.switch_data
+        values = await self.compiler.fetch(self.schema.keys)
+        if not values:
+            raise ValueError("Error fetching switch data: no supported keys answered")
+        return self.parse_poll(values)
 
     ###  Single Device Requests 
     async def get_switch_enabled(self, switch_name):
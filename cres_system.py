@@ -6,8 +6,8 @@ _LOGGER = logging.getLogger(__name__)
 
 
 class CresSystem:
-    def __init__(self, reqAddr):
-        self.req = CresRequest(reqAddr)
+    def __init__(self, reqAddr, req=None):
+        self.req = req if req is not None else CresRequest(reqAddr)
         self.cpuID = ""
         self.type = ""
         self.resetCause = ""
@@ -0,0 +1,171 @@
+from .const import WRITE_DEBOUNCE, WRITE_MAX_DELAY
+from .cres_query import QueryCompiler, is_error_value
+import asyncio
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def format_write_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+class WriteBuffer:
+    """Collect `key=value` writes briefly and send them as one command.
+
+    A later write to a key replaces a pending one (last write wins), so a
+    dragged slider sends only the value it came to rest on. Every caller
+    waits for the flush that carried its key and gets the controller's
+    answer for that key. `on_flush(sent, answers)` runs once after each
+    flush, before the callers are released, with the values sent and the
+    answers by key, or None for answers if the command failed. A flush
+    split over several commands reports the commands that went through
+    before a failure separately from the rest.
+    """
+
+    def __init__(self, req, on_flush=None, delay=WRITE_DEBOUNCE, max_delay=WRITE_MAX_DELAY):
+        self.req = req
+        self._compiler = QueryCompiler(req)
+        self.on_flush = on_flush
+        self.delay = delay
+        self.max_delay = max_delay
+        self._pending = {}
+        self._waiters = []
+        self._first_write = None
+        self._timer = None
+        self._flush_now = False
+        self._flush_task = None
+        self._lock = asyncio.Lock()
+
+    async def write(self, key, value, debounce=True):
+        """Queue a write and return the controller's answer for the key.
+
+        Without `debounce` the write goes out on the next loop iteration,
+        together with whatever else is pending by then.
+        """
+        loop = asyncio.get_running_loop()
+        # Re-insert so the flushed command keeps the order of the last writes
+        self._pending.pop(key, None)
+        self._pending[key] = format_write_value(value)
+        waiter = loop.create_future()
+        self._waiters.append((key, waiter))
+
+        now = time.monotonic()
+        if self._first_write is None:
+            self._first_write = now
+        delay = min(self.delay, max(0, self._first_write + self.max_delay - now))
+        if not debounce:
+            delay = 0
+        # Debounced writes push the flush back, but never one already due now
+        if self._timer is not None and not self._flush_now:
+            self._timer.cancel()
+            self._timer = None
+        if self._timer is None:
+            self._timer = loop.call_later(delay, self._start_flush)
+            self._flush_now = not debounce
+        return await asyncio.shield(waiter)
+
+    async def write_many(self, values, debounce=True):
+        """Queue several writes for the same flush; returns the answers by key."""
+        answers = await asyncio.gather(
+            *(self.write(key, value, debounce) for key, value in values.items())
+        )
+        return dict(zip(values, answers))
+
+    def _start_flush(self):
+        self._timer = None
+        self._flush_now = False
+        self._flush_task = asyncio.ensure_future(self.flush())
+        self._flush_task.add_done_callback(self._flush_done)
+
+    @staticmethod
+    def _flush_done(task):
+        # The callers got the exception already
+        if not task.cancelled():
+            task.exception()
+
+    async def flush(self):
+        """Send everything pending now; returns the answers by key."""
+        async with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+                self._flush_now = False
+            pending, self._pending = self._pending, {}
+            waiters, self._waiters = self._waiters, []
+            self._first_write = None
+            if not pending:
+                return {}
+
+            results, error = await self._send(pending)
+            if error is None:
+                await self._notify_flush(pending, results)
+            else:
+                # Commands that went through before the failure are confirmed,
+                # only the keys of the failed and unsent ones are rolled back
+                sent = {key: value for key, value in pending.items() if key in results}
+                if sent:
+                    await self._notify_flush(sent, results)
+                await self._notify_flush(
+                    {key: value for key, value in pending.items() if key not in results}, None
+                )
+
+            for key, waiter in waiters:
+                if waiter.done():
+                    continue
+                if error is not None and key not in results:
+                    waiter.set_exception(error)
+                    # Retrieved here too, in case every caller was cancelled
+                    waiter.exception()
+                else:
+                    waiter.set_result(results.get(key))
+            if error is not None:
+                raise error
+            return results
+
+    async def _notify_flush(self, sent, results):
+        if self.on_flush is None:
+            return
+        try:
+            await self.on_flush(sent, results)
+        except Exception as e:
+            _LOGGER.warning(f"Aktualisierung nach Schreibbefehl fehlgeschlagen: {e}")
+
+    async def _send(self, pending):
+        """Send the pending writes in order.
+
+        Returns the answers by key and the error that stopped the flush, or
+        None if every command went out.
+        """
+        # Large flushes, e.g. a whole profile, go out in as few commands as
+        # fit the URL budget, in the order they were written
+        commands = self._compiler.compile([f"{key}={value}" for key, value in pending.items()])
+        results = {}
+        error = None
+        for command in commands:
+            keys = [part.split("=", 1)[0] for part in command]
+            try:
+                response = await self.req._get_request(";".join(command))
+            except Exception as e:
+                error = e
+                break
+            parts = str(response).split(";")
+            if len(parts) != len(keys):
+                _LOGGER.warning(f"Unerwartete Antwort auf Schreibbefehl {keys}: {response}")
+                parts = [None] * len(keys)
+            results.update(zip(keys, parts))
+        for key, raw in results.items():
+            if raw is not None and is_error_value(raw):
+                _LOGGER.error(f"Schreiben von {key}={pending[key]} abgelehnt: {raw}")
+        return results, error
+
+    async def close(self):
+        """Flush what is still pending, e.g. before the entry unloads."""
+        if self._timer is not None or self._pending:
+            try:
+                await self.flush()
+            except Exception as e:
+                _LOGGER.warning(f"Ausstehende Schreibbefehle konnten nicht gesendet werden: {e}")
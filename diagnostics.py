@@ -0,0 +1,54 @@
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+from .const import CONF_HOSTS
+from .coordinator import entry_coordinators
+
+TO_REDACT = {CONF_HOST, CONF_HOSTS}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
+    """Return request statistics and poll state of a CresControl entry."""
+    coordinators = entry_coordinators(hass, entry, pending=True)
+    diagnostics = {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": dict(entry.options),
+        },
+    }
+    if CONF_HOSTS not in entry.data:
+        return {**diagnostics, **_controller_diagnostics(coordinators[0])}
+    # The unit id is derived from the host, the position in the host list
+    # tells the controllers apart without giving the address away
+    hosts = entry.data[CONF_HOSTS]
+    diagnostics["controllers"] = [
+        {"unit": hosts.index(coordinator.host), **_controller_diagnostics(coordinator)}
+        for coordinator in coordinators
+    ]
+    return diagnostics
+
+
+def _controller_diagnostics(coordinator) -> dict:
+    control = coordinator.controller
+    return {
+        "firmware_type": control.firmware_type,
+        "requests": control.req.stats.as_dict(),
+        "request_timeout": control.req.request_timeout(),
+        "circuit_breaker": control.req.breaker.as_dict(),
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "stale": coordinator.stale,
+            "pending_setup": coordinator.pending_setup,
+            "sample_age": coordinator.sample_age(),
+            "schedule": coordinator.schedule_stats,
+            "data_version": coordinator.data_version,
+            "subscribed_keys": sorted(coordinator.subscribed_keys or ()),
+            "notify_stats": dict(coordinator.notify_stats),
+        },
+        "capabilities": control.capabilities.as_dict(),
+        "devices": [
+            {"id": device.device_id, "type": device.device_type, "state": dict(device.state)}
+            for device in control.devices
+        ],
+    }
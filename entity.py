@@ -0,0 +1,86 @@
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
+
+
+class CresEntity(CoordinatorEntity):
+    """Coordinator entity that tells the coordinator which device keys it reads.
+
+    Only keys of entities that are added to Home Assistant are polled, so
+    entities disabled in the registry cost no requests. After a poll the
+    entity writes its state only if one of its keys, its availability or
+    its staleness changed.
+    """
+
+    _seen_version = 0
+    _seen_available = None
+    _seen_stale = None
+
+    @property
+    def poll_keys(self):
+        """Device keys whose values this entity shows."""
+        return ()
+
+    def _unit_id(self, value):
+        """Scope a unique id or device identifier to the controller of a fleet."""
+        unit_id = self.coordinator.unit_id
+        return value if unit_id is None else f"{value}_{unit_id}"
+
+    def _unit_name(self, name):
+        """Prefix a device name with the host of a fleet controller."""
+        if self.coordinator.unit_id is None:
+            return name
+        return f"{self.coordinator.host} {name}"
+
+    @property
+    def suggested_object_id(self):
+        # Entity names repeat across the controllers of a fleet
+        object_id = super().suggested_object_id
+        if self.coordinator.unit_id is None or object_id is None:
+            return object_id
+        return f"{self.coordinator.unit_id} {object_id}"
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        self.async_on_remove(self.coordinator.async_subscribe_keys(self.poll_keys))
+        self._seen_version = self.coordinator.data_version
+        self._seen_available = self.available
+        self._seen_stale = self.coordinator.stale
+
+    @property
+    def extra_state_attributes(self):
+        """Flag values the controller did not confirm in the last poll.
+
+        While stale, the age and time of the last good sample are added as
+        of the state write; they are left out otherwise so fresh polls do
+        not churn the attributes.
+        """
+        if not self.coordinator.stale:
+            return {"stale": False}
+        attributes = {"stale": True}
+        age = self.coordinator.sample_age()
+        if age is not None:
+            attributes["sample_age"] = round(age)
+            attributes["last_sample"] = dt_util.utc_from_timestamp(
+                self.coordinator.last_sample_time
+            ).isoformat()
+        return attributes
+
+    def _state_changed(self):
+        """Return True if the last poll changed anything this entity shows."""
+        keys = self.poll_keys
+        return not keys or self.coordinator.keys_changed_since(keys, self._seen_version)
+
+    @callback
+    def _handle_coordinator_update(self):
+        available = self.available
+        stale = self.coordinator.stale
+        if not self._state_changed() and available == self._seen_available and stale == self._seen_stale:
+            self.coordinator.notify_stats["suppressed"] += 1
+            return
+
+        self._seen_version = self.coordinator.data_version
+        self._seen_available = available
+        self._seen_stale = stale
+        self.coordinator.notify_stats["writes"] += 1
+        self.async_write_ha_state()
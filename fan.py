@@ -1,25 +1,26 @@
 import logging
 from homeassistant.components.fan import FanEntity, FanEntityFeature
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from .const import DOMAIN
+from .coordinator import entry_coordinators
+from .cres_control import DeviceType
+from .entity import CresEntity
 
 _LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup_entry(hass, entry, async_add_entities):
     """Setup fan platform."""
-    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
-
-   
-    fan_entity = CresFanEntity(coordinator, entry.entry_id)
+    fan_entities = [
+        CresFanEntity(coordinator, entry.entry_id) for coordinator in entry_coordinators(hass, entry)
+    ]
     async_add_entities(
-        [fan_entity], True
+        fan_entities, True
     ) 
 
-    _LOGGER.debug(f"Fan entity {fan_entity.name} added to Home Assistant")
+    _LOGGER.debug(f"{len(fan_entities)} fan entities added to Home Assistant")
 
 
-class CresFanEntity(CoordinatorEntity, FanEntity):
+class CresFanEntity(CresEntity, FanEntity):
     def __init__(self, coordinator, entry_id):
         super().__init__(coordinator)
         self._entry_id = entry_id
@@ -27,7 +28,7 @@ class CresFanEntity(CoordinatorEntity, FanEntity):
 
     @property
     def unique_id(self):
-        return f"crescontrol_fan_{self._entry_id}"
+        return self._unit_id(f"crescontrol_fan_{self._entry_id}")
 
     @property
     def name(self):
@@ -37,13 +38,18 @@ class CresFanEntity(CoordinatorEntity, FanEntity):
     def device_info(self):
         """Return device information about this entity, ensuring RPM sensor is part of this device."""
         return {
-            "identifiers": {(DOMAIN, self._device_id)},
-            "name": "CresControl Fan",
+            "identifiers": {(DOMAIN, self._unit_id(self._device_id))},
+            "name": self._unit_name("CresControl Fan"),
             "manufacturer": "cre.sience",
             "model": "CresControl Fan",
             "sw_version": "1.0",
         }
 
+    @property
+    def poll_keys(self):
+        # The minimum duty cycle is what turning on without a percentage sets
+        return ("fan:enabled", "fan:duty-cycle", "fan:duty-cycle-min")
+
     @property
     def supported_features(self):
         return (
@@ -91,45 +97,28 @@ class CresFanEntity(CoordinatorEntity, FanEntity):
         """Turn on the fan using the coordinator."""
         _LOGGER.debug(f"Turning on fan with percentage {percentage}")
         if percentage == None:
-            minduty =  await self.coordinator.controller.fan.getFanDutyCycleMin()
-            await self.coordinator.controller.fan.setFanEnabled(True)
-            await self.coordinator.controller.fan.setFanDutyCycle(float(minduty))
-            await self.coordinator.async_update_single_device("fan")
-            self.async_write_ha_state()
-
-        else:
-            await self.coordinator.controller.fan.setFanEnabled(True)
-            await self.coordinator.controller.fan.setFanDutyCycle(float(percentage))
-            await self.coordinator.async_update_single_device("fan")
-            self.async_write_ha_state()
-
+            # The minimum duty cycle is polled on the slow tier, no need to ask for it
+            percentage = self.coordinator.data.get("fan", {}).get("minDutyCycle") or 0
+        await self._async_set_fan(True, percentage, debounce=False)
 
     async def async_turn_off(self, **kwargs):
         """Turn off the fan using the coordinator."""
         _LOGGER.debug("Turning off fan")
-
-        
-        await self.coordinator.controller.fan.setFanEnabled(False)
-        await self.coordinator.controller.fan.setFanDutyCycle(0)
-        await self.coordinator.async_update_single_device("fan")
-        self.async_write_ha_state()
+        await self._async_set_fan(False, 0, debounce=False)
 
     async def async_set_percentage(self, percentage):
         """Set the speed percentage of the fan using the coordinator."""
         _LOGGER.debug(f"Setting fan percentage to {percentage}")
+        # A dragged slider only sends the value it stops at
+        await self._async_set_fan(percentage > 0, percentage)
 
-       
-        if percentage > 0:
-            await self.coordinator.controller.fan.setFanEnabled(True)
-        else:
-            await self.coordinator.controller.fan.setFanEnabled(False)
+    async def _async_set_fan(self, enabled, duty_cycle, debounce=True):
+        """Send enabled state and duty cycle in one command.
 
-        await self.coordinator.controller.fan.setFanDutyCycle(float(percentage))
-
-      
-        await self.coordinator.async_update_single_device("fan")
-        self.async_write_ha_state()
+        The minimum duty cycle stays as it is, it has its own number entity.
+        """
+        fan = self.coordinator.controller.fan
+        await self.coordinator.async_write_many(fan.write_values(enabled, duty_cycle), debounce)
 
     async def async_set_value(self, value: float):
-        await self.coordinator.async_update_single_device("fan")
-        self.async_write_ha_state()
+        await self.coordinator.async_update_single_device("fan", DeviceType.FAN)
@@ -1,13 +1,37 @@
 from homeassistant.components.number import NumberEntity
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from .const import DOMAIN
+from .coordinator import entry_coordinators
+from .entity import CresEntity
 import logging
 
 _LOGGER = logging.getLogger(__name__)
 
+# Allowed values of writable numbers by (channel kind, field), shared with
+# the apply_profile service
+NUMBER_RANGES = {
+    ("fan", "duty-cycle"): (0, 100),
+    ("fan", "duty-cycle-min"): (0, 100),
+    ("in", "calib-offset"): (0, 10),
+    ("in", "calib-factor"): (1, 10),
+    ("out", "voltage"): (0, 10),
+    ("out", "calib-offset"): (0, 10),
+    ("out", "calib-factor"): (1, 10),
+    ("out", "threshold"): (0, 100),
+    ("out", "pwm-frequency"): (0, 1000),
+    ("switch", "duty-cycle"): (0, 100),
+    ("switch", "pwm-frequency"): (0, 1000),
+    ("switch", "pwm-enabled"): (0, 1),
+}
+
 
 async def async_setup_entry(hass, entry, async_add_entities):
-    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    numbers = []
+    for coordinator in entry_coordinators(hass, entry):
+        numbers.extend(_create_numbers(coordinator, entry))
+    async_add_entities(numbers)
+
+
+def _create_numbers(coordinator, entry):
     numbers = []
 
     # Only calibration-related number entities for Inputs
@@ -22,24 +46,24 @@ async def async_setup_entry(hass, entry, async_add_entities):
         numbers.append(CresOutputCalibFactorNumber(coordinator, output_name, entry))
         numbers.append(CresOutputThresholdNumber(coordinator,output_name,entry))
         
-        # Add PWM-specific numbers only for 'a' and 'b'
-        if output_name in ["a", "b"]:
+        # Add PWM-specific numbers only for outputs that support PWM
+        if output_name in coordinator.controller.outputs.isPWM:
             numbers.append(
                 CresOutputPWMFrequencyNumber(coordinator, output_name, entry)
             )
 
     # Setup Number entities for Switches
-    for switch_name in ["12v", "24v-a", "24v-b"]:
+    for switch_name in coordinator.controller.switches.devices:
         numbers.append(CresSwitchDutyCycleNumber(coordinator, switch_name, entry))
         numbers.append(CresSwitchPWMFrequencyNumber(coordinator, switch_name, entry))
 
     # Add MinDutyCycle for Fan directly
     numbers.append(CresFanMinDutyCycleNumber(coordinator, "fan", entry))
 
-    async_add_entities(numbers)
+    return numbers
 
 
-class CresControlNumber(CoordinatorEntity, NumberEntity):
+class CresControlNumber(CresEntity, NumberEntity):
     def __init__(self, coordinator, device_name, entry, device_type):
         super().__init__(coordinator)
         self._device_name = device_name.lower()  
@@ -54,8 +78,8 @@ class CresControlNumber(CoordinatorEntity, NumberEntity):
         if self._device_type == "input":
             device_id = f"{DOMAIN}_input_{device_id_normalized}"
             return {
-                "identifiers": {(DOMAIN, device_id)},
-                "name": f"Input {device_id_normalized.upper()}",
+                "identifiers": {(DOMAIN, self._unit_id(device_id))},
+                "name": self._unit_name(f"Input {device_id_normalized.upper()}"),
                 "manufacturer": "cre.sience",
                 "model": "CresControl Input",
                 "sw_version": "1.0",
@@ -63,8 +87,8 @@ class CresControlNumber(CoordinatorEntity, NumberEntity):
         elif self._device_type == "switch":
             device_id = f"{DOMAIN}_{device_id_normalized}_device"
             return {
-                "identifiers": {(DOMAIN, device_id)},
-                "name": f"Switch {device_id_normalized.capitalize()}",
+                "identifiers": {(DOMAIN, self._unit_id(device_id))},
+                "name": self._unit_name(f"Switch {device_id_normalized.capitalize()}"),
                 "manufacturer": "cre.sience",
                 "model": "CresControl Switch",
                 "sw_version": "1.0",
@@ -72,8 +96,8 @@ class CresControlNumber(CoordinatorEntity, NumberEntity):
         elif self._device_type == "fan":
             device_id = f"{DOMAIN}_fan_device"
             return {
-                "identifiers": {(DOMAIN, device_id)},
-                "name": "CresControl Fan",
+                "identifiers": {(DOMAIN, self._unit_id(device_id))},
+                "name": self._unit_name("CresControl Fan"),
                 "manufacturer": "cre.sience",
                 "model": "Fan",
                 "sw_version": "1.0",
@@ -81,8 +105,8 @@ class CresControlNumber(CoordinatorEntity, NumberEntity):
         elif self._device_type == "output":
             device_id = f"{DOMAIN}_{self._device_type}_{device_id_normalized}_device"
             return {
-                "identifiers": {(DOMAIN, device_id)},
-                "name": f"{self._device_type.capitalize()} {device_id_normalized.capitalize()}",
+                "identifiers": {(DOMAIN, self._unit_id(device_id))},
+                "name": self._unit_name(f"{self._device_type.capitalize()} {device_id_normalized.capitalize()}"),
                 "manufacturer": "cre.sience",
                 "model": f"CresControl {self._device_type.capitalize()}",
                 "sw_version": "1.0",
@@ -90,8 +114,8 @@ class CresControlNumber(CoordinatorEntity, NumberEntity):
         else:
             device_id = f"{DOMAIN}_{self._device_type}_{device_id_normalized}_device"
             return {
-                "identifiers": {(DOMAIN, device_id)},
-                "name": f"{self._device_type.capitalize()} {device_id_normalized.capitalize()}",
+                "identifiers": {(DOMAIN, self._unit_id(device_id))},
+                "name": self._unit_name(f"{self._device_type.capitalize()} {device_id_normalized.capitalize()}"),
                 "manufacturer": "cre.sience",
                 "model": f"CresControl {self._device_type.capitalize()}",
                 "sw_version": "1.0",
@@ -99,7 +123,7 @@ class CresControlNumber(CoordinatorEntity, NumberEntity):
 
     @property
     def unique_id(self):
-        return f"crescontrol_{self._device_type}_{self._device_name}_number"
+        return self._unit_id(f"crescontrol_{self._device_type}_{self._device_name}_number")
 
 def safe_float_conversion(value, entity_name, attribute_name):
     """Converts a value to float and logs error if conversion fails."""
@@ -129,7 +153,7 @@ def safe_float_conversion(value, entity_name, attribute_name):
         )
         raise
 
-class CresFanMinDutyCycleNumber(CoordinatorEntity, NumberEntity):
+class CresFanMinDutyCycleNumber(CresEntity, NumberEntity):
     def __init__(self, coordinator, device_name, entry):
         super().__init__(coordinator)
         self._device_name = device_name
@@ -137,18 +161,20 @@ class CresFanMinDutyCycleNumber(CoordinatorEntity, NumberEntity):
 
     async def async_set_value(self, value: float):
         _LOGGER.debug(f"Setting fan {self._device_name} min duty cycle to {value}")
-        await self.coordinator.controller.fan.setFanDutyCycleMin(value)
-        await self.coordinator.async_update_single_device("fan")
-        self.async_write_ha_state()
+        await self.coordinator.async_write("fan:duty-cycle-min", value)
         
         
     @property
     def name(self):
         return f"DutyCycle Min "
 
+    @property
+    def poll_keys(self):
+        return ("fan:duty-cycle-min",)
+
     @property
     def unique_id(self):
-        return f"crescontrol_{self._device_name}_min_duty_cycle"
+        return self._unit_id(f"crescontrol_{self._device_name}_min_duty_cycle")
 
     @property
     def value(self):
@@ -162,8 +188,8 @@ class CresFanMinDutyCycleNumber(CoordinatorEntity, NumberEntity):
         """Return device information about this entity."""
         device_id = f"{DOMAIN}_fan_device"
         return {
-            "identifiers": {(DOMAIN, device_id)},
-            "name": "CresControl Fan",
+            "identifiers": {(DOMAIN, self._unit_id(device_id))},
+            "name": self._unit_name("CresControl Fan"),
             "manufacturer": "cre.sience",
             "model": "CresControl Fan",
             "sw_version": "1.0",
@@ -171,11 +197,11 @@ class CresFanMinDutyCycleNumber(CoordinatorEntity, NumberEntity):
 
     @property
     def min_value(self):
-        return 0
+        return NUMBER_RANGES[("fan", "duty-cycle-min")][0]
 
     @property
     def max_value(self):
-        return 100
+        return NUMBER_RANGES[("fan", "duty-cycle-min")][1]
     
     @property
     def step(self):
@@ -194,9 +220,13 @@ class CresInputCalibOffsetNumber(CresControlNumber):
     def name(self):
         return f"Input {self._input_name} Calib-Offset"
 
+    @property
+    def poll_keys(self):
+        return (f"in-{self._input_name}:calib-offset",)
+
     @property
     def unique_id(self):
-        return f"crescontrol_input_{self._input_name}_calib_offset"
+        return self._unit_id(f"crescontrol_input_{self._input_name}_calib_offset")
 
     @property
     def value(self):
@@ -209,11 +239,11 @@ class CresInputCalibOffsetNumber(CresControlNumber):
 
     @property
     def min_value(self):
-        return 0
+        return NUMBER_RANGES[("in", "calib-offset")][0]
 
     @property
     def max_value(self):
-        return 10
+        return NUMBER_RANGES[("in", "calib-offset")][1]
     
     @property
     def step(self):
@@ -226,10 +256,7 @@ class CresInputCalibOffsetNumber(CresControlNumber):
 
     async def async_set_value(self, value: float):
         _LOGGER.debug(f"Setting input {self._input_name} calibration offset to {value}")
-        await self.coordinator.controller.inputs.set_input_calib_offset(
-            self._input_name, value
-        )
-        await self.coordinator.async_request_refresh()
+        await self.coordinator.async_write(f"in-{self._input_name}:calib-offset", value)
 
 class CresInputCalibFactorNumber(CresControlNumber):
     def __init__(self, coordinator, input_name, entry):
@@ -240,9 +267,13 @@ class CresInputCalibFactorNumber(CresControlNumber):
     def name(self):
         return f"Input {self._input_name} Calib-Factor"
 
+    @property
+    def poll_keys(self):
+        return (f"in-{self._input_name}:calib-factor",)
+
     @property
     def unique_id(self):
-        return f"crescontrol_input_{self._input_name}_calib_factor"
+        return self._unit_id(f"crescontrol_input_{self._input_name}_calib_factor")
 
     @property
     def value(self):
@@ -255,11 +286,11 @@ class CresInputCalibFactorNumber(CresControlNumber):
 
     @property
     def min_value(self):
-        return 1
+        return NUMBER_RANGES[("in", "calib-factor")][0]
 
     @property
     def max_value(self):
-        return 10
+        return NUMBER_RANGES[("in", "calib-factor")][1]
     
     @property
     def step(self):
@@ -273,10 +304,7 @@ class CresInputCalibFactorNumber(CresControlNumber):
 
     async def async_set_value(self, value: float):
         _LOGGER.debug(f"Setting input {self._input_name} calibration factor to {value}")
-        await self.coordinator.controller.inputs.set_input_calib_factor(
-            self._input_name, value
-        )
-        await self.coordinator.async_request_refresh()
+        await self.coordinator.async_write(f"in-{self._input_name}:calib-factor", value)
 
 class CresOutputVoltageNumber(CresControlNumber):
     def __init__(self, coordinator, output_name, entry):
@@ -287,9 +315,13 @@ class CresOutputVoltageNumber(CresControlNumber):
     def name(self):
         return f"Output {self._output_name} Voltage"
 
+    @property
+    def poll_keys(self):
+        return (f"out-{self._output_name}:voltage",)
+
     @property
     def unique_id(self):
-        return f"crescontrol_output_{self._output_name}_voltage"
+        return self._unit_id(f"crescontrol_output_{self._output_name}_voltage")
 
     @property
     def value(self):
@@ -302,11 +334,11 @@ class CresOutputVoltageNumber(CresControlNumber):
 
     @property
     def min_value(self):
-        return 0
+        return NUMBER_RANGES[("out", "voltage")][0]
 
     @property
     def max_value(self):
-        return 10
+        return NUMBER_RANGES[("out", "voltage")][1]
 
     @property
     def step(self):
@@ -318,10 +350,7 @@ class CresOutputVoltageNumber(CresControlNumber):
 
     async def async_set_value(self, value: float):
         _LOGGER.debug(f"Setting output {self._output_name} voltage to {value}")
-        await self.coordinator.controller.outputs.set_output_voltage(
-            self._output_name, value
-        )
-        await self.coordinator.async_request_refresh()
+        await self.coordinator.async_write(f"out-{self._output_name}:voltage", value)
 
 class CresOutputCalibOffsetNumber(CresControlNumber):
     def __init__(self, coordinator, output_name, entry):
@@ -332,9 +361,13 @@ class CresOutputCalibOffsetNumber(CresControlNumber):
     def name(self):
         return f"Output {self._output_name} Calib-Offset"
 
+    @property
+    def poll_keys(self):
+        return (f"out-{self._output_name}:calib-offset",)
+
     @property
     def unique_id(self):
-        return f"crescontrol_output_{self._output_name}_calib_offset"
+        return self._unit_id(f"crescontrol_output_{self._output_name}_calib_offset")
 
     @property
     def value(self):
@@ -347,11 +380,11 @@ class CresOutputCalibOffsetNumber(CresControlNumber):
 
     @property
     def min_value(self):
-        return 0
+        return NUMBER_RANGES[("out", "calib-offset")][0]
 
     @property
     def max_value(self):
-        return 10
+        return NUMBER_RANGES[("out", "calib-offset")][1]
 
     @property
     def step(self):
@@ -369,10 +402,7 @@ class CresOutputCalibOffsetNumber(CresControlNumber):
         _LOGGER.debug(
             f"Setting output {self._output_name} calibration offset to {value}"
         )
-        await self.coordinator.controller.outputs.set_output_calib_offset(
-            self._output_name, value
-        )
-        await self.coordinator.async_request_refresh()
+        await self.coordinator.async_write(f"out-{self._output_name}:calib-offset", value)
 
 class CresOutputCalibFactorNumber(CresControlNumber):
     def __init__(self, coordinator, output_name, entry):
@@ -383,9 +413,13 @@ class CresOutputCalibFactorNumber(CresControlNumber):
     def name(self):
         return f"Output {self._output_name} Calib-Factor"
 
+    @property
+    def poll_keys(self):
+        return (f"out-{self._output_name}:calib-factor",)
+
     @property
     def unique_id(self):
-        return f"crescontrol_output_{self._output_name}_calib_factor"
+        return self._unit_id(f"crescontrol_output_{self._output_name}_calib_factor")
 
     @property
     def value(self):
@@ -398,11 +432,11 @@ class CresOutputCalibFactorNumber(CresControlNumber):
 
     @property
     def min_value(self):
-        return 1  
+        return NUMBER_RANGES[("out", "calib-factor")][0]
 
     @property
     def max_value(self):
-        return 10  
+        return NUMBER_RANGES[("out", "calib-factor")][1]
 
     @property
     def step(self):
@@ -416,10 +450,7 @@ class CresOutputCalibFactorNumber(CresControlNumber):
         _LOGGER.debug(
             f"Setting output {self._output_name} calibration factor to {value}"
         )
-        await self.coordinator.controller.outputs.set_output_calib_factor(
-            self._output_name, value
-        )
-        await self.coordinator.async_request_refresh()
+        await self.coordinator.async_write(f"out-{self._output_name}:calib-factor", value)
 
 class CresSwitchDutyCycleNumber(CresControlNumber):
     def __init__(self, coordinator, switch_name, entry):
@@ -430,9 +461,13 @@ class CresSwitchDutyCycleNumber(CresControlNumber):
     def name(self):
         return f"Switch {self._switch_name} Duty Cycle"
 
+    @property
+    def poll_keys(self):
+        return (f"switch-{self._switch_name}:duty-cycle",)
+
     @property
     def unique_id(self):
-        return f"crescontrol_switch_{self._switch_name}_duty_cycle"
+        return self._unit_id(f"crescontrol_switch_{self._switch_name}_duty_cycle")
 
     @property
     def value(self):
@@ -445,11 +480,11 @@ class CresSwitchDutyCycleNumber(CresControlNumber):
 
     @property
     def min_value(self):
-        return 0
+        return NUMBER_RANGES[("switch", "duty-cycle")][0]
 
     @property
     def max_value(self):
-        return 100
+        return NUMBER_RANGES[("switch", "duty-cycle")][1]
 
     @property
     def unit_of_measurement(self):
@@ -457,10 +492,7 @@ class CresSwitchDutyCycleNumber(CresControlNumber):
 
     async def async_set_value(self, value: float):
         _LOGGER.debug(f"Setting switch {self._switch_name} duty cycle to {value}")
-        await self.coordinator.controller.switches.set_duty_cycle(
-            self._switch_name, value
-        )
-        await self.coordinator.async_request_refresh()
+        await self.coordinator.async_write(f"switch-{self._switch_name}:duty-cycle", value)
 
 class CresOutputPWMFrequencyNumber(CresControlNumber):
     def __init__(self, coordinator, output_name, entry):
@@ -471,9 +503,13 @@ class CresOutputPWMFrequencyNumber(CresControlNumber):
     def name(self):
         return f"Output {self._output_name} PWM Frequency"
 
+    @property
+    def poll_keys(self):
+        return (f"out-{self._output_name}:pwm-frequency",)
+
     @property
     def unique_id(self):
-        return f"crescontrol_output_{self._output_name}_pwm_frequency"
+        return self._unit_id(f"crescontrol_output_{self._output_name}_pwm_frequency")
 
     @property
     def value(self):
@@ -497,11 +533,11 @@ class CresOutputPWMFrequencyNumber(CresControlNumber):
 
     @property
     def min_value(self):
-        return 0
+        return NUMBER_RANGES[("out", "pwm-frequency")][0]
 
     @property
     def max_value(self):
-        return 1000
+        return NUMBER_RANGES[("out", "pwm-frequency")][1]
 
     @property
     def step(self):
@@ -513,10 +549,7 @@ class CresOutputPWMFrequencyNumber(CresControlNumber):
 
     async def async_set_value(self, value: float):
         _LOGGER.debug(f"Setting output {self._output_name} PWM frequency to {value}")
-        await self.coordinator.controller.outputs.set_output_pwm_frequency(
-            self._output_name, value
-        )
-        await self.coordinator.async_request_refresh()
+        await self.coordinator.async_write(f"out-{self._output_name}:pwm-frequency", value)
 
 class CresSwitchPWMFrequencyNumber(CresControlNumber):
     def __init__(self, coordinator, switch_name, entry):
@@ -527,9 +560,13 @@ class CresSwitchPWMFrequencyNumber(CresControlNumber):
     def name(self):
         return f"Switch {self._switch_name} PWM Frequency"
 
+    @property
+    def poll_keys(self):
+        return (f"switch-{self._switch_name}:pwm-frequency",)
+
     @property
     def unique_id(self):
-        return f"crescontrol_switch_{self._switch_name}_pwm_frequency"
+        return self._unit_id(f"crescontrol_switch_{self._switch_name}_pwm_frequency")
 
     @property
     def value(self):
@@ -553,11 +590,11 @@ class CresSwitchPWMFrequencyNumber(CresControlNumber):
 
     @property
     def min_value(self):
-        return 0
+        return NUMBER_RANGES[("switch", "pwm-frequency")][0]
 
     @property
     def max_value(self):
-        return 1000
+        return NUMBER_RANGES[("switch", "pwm-frequency")][1]
     
     @property
     def step(self):
@@ -569,10 +606,7 @@ class CresSwitchPWMFrequencyNumber(CresControlNumber):
 
     async def async_set_value(self, value: float):
         _LOGGER.debug(f"Setting switch {self._switch_name} PWM frequency to {value}")
-        await self.coordinator.controller.switches.set_pwm_frequency(
-            self._switch_name, value
-        )
-        await self.coordinator.async_request_refresh()
+        await self.coordinator.async_write(f"switch-{self._switch_name}:pwm-frequency", value)
 
 class CresSwitchPWMEnabledNumber(CresControlNumber):
     def __init__(self, coordinator, switch_name, entry):
@@ -583,9 +617,13 @@ class CresSwitchPWMEnabledNumber(CresControlNumber):
     def name(self):
         return f"Switch {self._switch_name} PWM Enabled"
 
+    @property
+    def poll_keys(self):
+        return (f"switch-{self._switch_name}:pwm-enabled",)
+
     @property
     def unique_id(self):
-        return f"crescontrol_switch_{self._switch_name}_pwm_enabled"
+        return self._unit_id(f"crescontrol_switch_{self._switch_name}_pwm_enabled")
 
     @property
     def value(self):
@@ -598,21 +636,18 @@ class CresSwitchPWMEnabledNumber(CresControlNumber):
 
     @property
     def min_value(self):
-        return 0
+        return NUMBER_RANGES[("switch", "pwm-enabled")][0]
 
     @property
     def max_value(self):
-        return 1
+        return NUMBER_RANGES[("switch", "pwm-enabled")][1]
 
     async def async_set_value(self, value: float):
         pwm_enabled = value > 0.5
         _LOGGER.debug(
             f"Setting switch {self._switch_name} PWM enabled to {pwm_enabled}"
         )
-        await self.coordinator.controller.switches.set_pwm_enabled(
-            self._switch_name, pwm_enabled
-        )
-        await self.coordinator.async_request_refresh()
+        await self.coordinator.async_write(f"switch-{self._switch_name}:pwm-enabled", pwm_enabled)
 
 class CresOutputThresholdNumber(CresControlNumber):
     def __init__(self, coordinator, output_name, entry):
@@ -623,9 +658,13 @@ class CresOutputThresholdNumber(CresControlNumber):
     def name(self):
         return f"Output {self._output_name} Threshold"
 
+    @property
+    def poll_keys(self):
+        return (f"out-{self._output_name}:threshold",)
+
     @property
     def unique_id(self):
-        return f"crescontrol_output_{self._output_name}_threshold"
+        return self._unit_id(f"crescontrol_output_{self._output_name}_threshold")
 
     @property
     def value(self):
@@ -639,11 +678,11 @@ class CresOutputThresholdNumber(CresControlNumber):
 
     @property
     def min_value(self):
-        return 0
+        return NUMBER_RANGES[("out", "threshold")][0]
 
     @property
     def max_value(self):
-        return 100
+        return NUMBER_RANGES[("out", "threshold")][1]
     
     @property
     def step(self):
@@ -655,5 +694,4 @@ class CresOutputThresholdNumber(CresControlNumber):
 
     async def async_set_value(self, value: float):
         _LOGGER.debug(f"Setting output {self._output_name} threshold to {value}")
-        await self.coordinator.controller.outputs.set_output_threshold(self._output_name, value)
-        await self.coordinator.async_request_refresh()
+        await self.coordinator.async_write(f"out-{self._output_name}:threshold", value)
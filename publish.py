@@ -0,0 +1,86 @@
+from dataclasses import dataclass, replace
+import math
+
+
+@dataclass(frozen=True)
+class PublishPolicy:
+    """When a new reading of a measurement is worth a state write."""
+
+    # Smallest absolute change that is published
+    absolute: float = 0.0
+    # Smallest change relative to the last published value, e.g. 0.02 for 2 %
+    relative: float = 0.0
+    # Readings are rounded to this step, e.g. 0.1 for one decimal
+    resolution: float | None = None
+    # Publish the current reading after this many seconds without a write
+    max_silence: float | None = None
+
+
+# Deadbands are at least two resolution steps, so a reading that jitters
+# around a rounding boundary does not flip between neighbouring values
+DEFAULT_PUBLISH_POLICIES = {
+    "temperature": PublishPolicy(absolute=0.2, resolution=0.1),
+    "humidity": PublishPolicy(absolute=0.5, resolution=0.1),
+    "vpd": PublishPolicy(absolute=0.02, resolution=0.01),
+    "co2": PublishPolicy(absolute=10, relative=0.02, resolution=1),
+    "voltage": PublishPolicy(absolute=0.02, resolution=0.01),
+}
+
+# Used when publishing is disabled or a measurement has no policy: every change is written
+PASSTHROUGH_POLICY = PublishPolicy()
+
+# Rounded readings are compared against deadbands that are multiples of the resolution
+_EPSILON = 1e-9
+
+
+def publish_policy(measurement, enabled=True, max_silence=None):
+    """Return the policy for a measurement with the configured heartbeat."""
+    policy = DEFAULT_PUBLISH_POLICIES.get(measurement, PASSTHROUGH_POLICY) if enabled else PASSTHROUGH_POLICY
+    return replace(policy, max_silence=max_silence)
+
+
+class DeadbandPublisher:
+    """Filter the readings of one measurement through a PublishPolicy."""
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.value = None
+        self.published_at = None
+        self._decimals = (
+            max(0, -math.floor(math.log10(policy.resolution))) if policy.resolution else None
+        )
+
+    def quantize(self, value):
+        resolution = self.policy.resolution
+        if resolution is None:
+            return value
+        return round(round(value / resolution) * resolution, self._decimals)
+
+    def update(self, value, now):
+        """Offer a reading taken at `now`; return True if it becomes the published value."""
+        if value is None:
+            if self.value is None and self.published_at is not None:
+                return False
+            self.value = None
+            self.published_at = now
+            return True
+
+        value = self.quantize(value)
+        last = self.value
+        if last is None or self.published_at is None:
+            return self._publish(value, now)
+
+        policy = self.policy
+        delta = abs(value - last)
+        if delta > 0 and delta + _EPSILON >= max(policy.absolute, policy.relative * abs(last)):
+            return self._publish(value, now)
+
+        if policy.max_silence is not None and now - self.published_at >= policy.max_silence:
+            return self._publish(value, now)
+
+        return False
+
+    def _publish(self, value, now):
+        self.value = value
+        self.published_at = now
+        return True
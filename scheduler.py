@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import math
+from homeassistant.core import HomeAssistant, callback
+from .const import DOMAIN, MAX_IN_FLIGHT_REQUESTS
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_SCHEDULER = f"{DOMAIN}_scheduler"
+
+
+class PollScheduler:
+    """Poll every CresControl entry of the process from one place.
+
+    Coordinators get evenly spread phases within their poll interval, so
+    many controllers do not poll in lockstep. `limiter` caps the requests
+    in flight across all controllers. A tick whose previous poll is still
+    running is skipped. Each coordinator's `schedule_stats` reports its
+    phase, how late its ticks fired and how many were skipped.
+    """
+
+    def __init__(self, hass: HomeAssistant, max_in_flight=MAX_IN_FLIGHT_REQUESTS):
+        self.hass = hass
+        self.limiter = asyncio.Semaphore(max_in_flight)
+        self._coordinators = []
+        self._timers = {}
+        self._polls = {}
+
+    @callback
+    def add(self, coordinator):
+        """Take over the polling of a coordinator.
+
+        The coordinator must not have an update_interval of its own, its
+        timer would fire in lockstep with the others.
+        """
+        coordinator.schedule_stats = {"phase": 0.0, "lag_ms": None, "max_lag_ms": 0.0, "skipped": 0}
+        self._coordinators.append(coordinator)
+        self._rebalance()
+
+    @callback
+    def remove(self, coordinator):
+        """Stop polling a coordinator, e.g. when its entry unloads."""
+        if coordinator not in self._coordinators:
+            return
+        self._coordinators.remove(coordinator)
+        self._cancel(coordinator)
+        self._polls.pop(coordinator, None)
+        self._rebalance()
+
+    def __len__(self):
+        return len(self._coordinators)
+
+    def _cancel(self, coordinator):
+        timer = self._timers.pop(coordinator, None)
+        if timer is not None:
+            timer.cancel()
+
+    def _rebalance(self):
+        count = len(self._coordinators)
+        for index, coordinator in enumerate(self._coordinators):
+            coordinator.schedule_stats["phase"] = coordinator.poll_interval * index / count
+            self._cancel(coordinator)
+            self._schedule(coordinator)
+
+    def _schedule(self, coordinator):
+        loop = self.hass.loop
+        interval = coordinator.poll_interval
+        phase = coordinator.schedule_stats["phase"]
+        due = phase + (math.floor((loop.time() - phase) / interval) + 1) * interval
+        self._timers[coordinator] = loop.call_at(due, self._tick, coordinator, due)
+
+    @callback
+    def _tick(self, coordinator, due):
+        stats = coordinator.schedule_stats
+        lag_ms = max(0.0, self.hass.loop.time() - due) * 1000
+        stats["lag_ms"] = round(lag_ms, 1)
+        stats["max_lag_ms"] = round(max(stats["max_lag_ms"], lag_ms), 1)
+        self._schedule(coordinator)
+
+        poll = self._polls.get(coordinator)
+        if poll is not None and not poll.done():
+            stats["skipped"] += 1
+            _LOGGER.debug(f"Abfrage von {coordinator.host} läuft noch, überspringe")
+            return
+        self._polls[coordinator] = self.hass.async_create_background_task(
+            coordinator.async_refresh(), f"{DOMAIN} poll {coordinator.host}"
+        )
+
+
+@callback
+def async_get_scheduler(hass: HomeAssistant) -> PollScheduler:
+    """Return the scheduler shared by all entries, creating it on first use."""
+    scheduler = hass.data.get(DATA_SCHEDULER)
+    if scheduler is None:
+        scheduler = hass.data[DATA_SCHEDULER] = PollScheduler(hass)
+    return scheduler
@@ -1,21 +1,45 @@
+import abc
 from homeassistant.components.sensor import SensorEntity
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from homeassistant.const import UnitOfTemperature, PERCENTAGE, CONCENTRATION_PARTS_PER_MILLION
+from homeassistant.const import (
+    CONCENTRATION_PARTS_PER_MILLION,
+    PERCENTAGE,
+    EntityCategory,
+    UnitOfTemperature,
+    UnitOfTime,
+)
 from .const import DOMAIN
+from .coordinator import entry_coordinators
+from .entity import CresEntity
 import logging
+import time
 
 _LOGGER = logging.getLogger(__name__)
 
 SENSOR_TYPES = {
-    "temperature": {"unit": UnitOfTemperature.CELSIUS, "icon": "mdi:thermometer", "device_class": "temperature"},
-    "humidity": {"unit": PERCENTAGE, "icon": "mdi:water-percent", "device_class": "humidity"},
-    "vpd": {"unit": "kPa", "icon": "mdi:thermometer", "device_class": None},
-    "co2": {"unit": CONCENTRATION_PARTS_PER_MILLION, "icon": "mdi:carbon-dioxide", "device_class": "carbon_dioxide"},
-    "voltage": {"unit": "V", "icon": "mdi:flash", "device_class": None},
+    "temperature": {"unit": UnitOfTemperature.CELSIUS, "icon": "mdi:thermometer", "device_class": "temperature", "key": "temperature"},
+    "humidity": {"unit": PERCENTAGE, "icon": "mdi:water-percent", "device_class": "humidity", "key": "humidity"},
+    "vpd": {"unit": "kPa", "icon": "mdi:thermometer", "device_class": None, "key": "vpd"},
+    "co2": {"unit": CONCENTRATION_PARTS_PER_MILLION, "icon": "mdi:carbon-dioxide", "device_class": "carbon_dioxide", "key": "co2-concentration"},
+    "voltage": {"unit": "V", "icon": "mdi:flash", "device_class": None, "key": "voltage"},
+}
+
+# Diagnostic sensors over the controller's rolling request statistics
+REQUEST_STAT_TYPES = {
+    "latency_p50": {"name": "Request Latency P50", "unit": UnitOfTime.MILLISECONDS, "icon": "mdi:timer-outline"},
+    "latency_p95": {"name": "Request Latency P95", "unit": UnitOfTime.MILLISECONDS, "icon": "mdi:timer-alert-outline"},
+    "error_rate": {"name": "Request Error Rate", "unit": PERCENTAGE, "icon": "mdi:alert-circle-outline"},
+    "requests_per_minute": {"name": "Requests per Minute", "unit": "req/min", "icon": "mdi:swap-vertical"},
+    "schedule_lag": {"name": "Poll Scheduling Lag", "unit": UnitOfTime.MILLISECONDS, "icon": "mdi:timer-sand"},
 }
 
 async def async_setup_entry(hass, entry, async_add_entities):
-    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    sensors = []
+    for coordinator in entry_coordinators(hass, entry):
+        sensors.extend(_create_sensors(coordinator, entry))
+    async_add_entities(sensors)
+
+
+def _create_sensors(coordinator, entry):
     sensors = {}
 
     _LOGGER.debug(f"Starting setup of sensors. Coordinator data: {coordinator.data}")
@@ -43,18 +67,54 @@ async def async_setup_entry(hass, entry, async_add_entities):
                 sensors[entity_id] = CresInputVoltageEntity(device, coordinator, entry)
 
     if not sensors:
-        _LOGGER.error("No sensors found to add to Home Assistant")
+        _LOGGER.error(f"No sensors found on {coordinator.host} to add to Home Assistant")
 
-    async_add_entities(sensors.values())
-    _LOGGER.debug(f"Sensors added to Home Assistant: {list(sensors.keys())}")
+    for stat_type in REQUEST_STAT_TYPES:
+        sensors[f"request_{stat_type}"] = CresRequestStatsEntity(stat_type, coordinator, entry)
 
+    _LOGGER.debug(f"Sensors of {coordinator.host} added to Home Assistant: {list(sensors.keys())}")
+    return list(sensors.values())
 
 
-class CresSensorEntity(CoordinatorEntity, SensorEntity):
+
+class CresMeasurementEntity(CresEntity, SensorEntity):
+    """Sensor whose readings are rounded and published through a deadband."""
+
+    _measurement = None
+    _publisher = None
+
+    @abc.abstractmethod
+    def _get_state_from_coordinator(self):
+        """Return the raw reading from the coordinator data."""
+        raise NotImplementedError
+
+    def _reading(self):
+        try:
+            return float(self._get_state_from_coordinator())
+        except (TypeError, ValueError):
+            return None
+
+    async def async_added_to_hass(self):
+        self._publisher = self.coordinator.create_publisher(self._measurement)
+        self._publisher.update(self._reading(), time.monotonic())
+        await super().async_added_to_hass()
+
+    def _state_changed(self):
+        return self._publisher.update(self._reading(), time.monotonic())
+
+    @property
+    def state(self):
+        if self._publisher is None:
+            return self._reading()
+        return self._publisher.value
+
+
+class CresSensorEntity(CresMeasurementEntity):
     def __init__(self, device, sensor_type, coordinator, entry):
         super().__init__(coordinator)
         self._device = device
         self._sensor_type = sensor_type
+        self._measurement = sensor_type
         self._entry = entry
 
         _LOGGER.debug(
@@ -64,19 +124,23 @@ class CresSensorEntity(CoordinatorEntity, SensorEntity):
     @property
     def unique_id(self):
         normalized_device_id = self._device.device_id.lower()
-        return f"crescontrol_sensor_{normalized_device_id}_{self._sensor_type}_{self._entry.entry_id}"
+        return self._unit_id(f"crescontrol_sensor_{normalized_device_id}_{self._sensor_type}_{self._entry.entry_id}")
 
     @property
     def device_info(self):
         normalized_device_id = self._device.device_id.lower()
         return {
-            "identifiers": {(DOMAIN, normalized_device_id)},
-            "name": f"{normalized_device_id.capitalize()}",
+            "identifiers": {(DOMAIN, self._unit_id(normalized_device_id))},
+            "name": self._unit_name(f"{normalized_device_id.capitalize()}"),
             "manufacturer": "cre.sience",
             "model": "CresControl Sensor",
             "sw_version": "1.0",
         }
 
+    @property
+    def poll_keys(self):
+        return (f"extension:{self._device.device_id}:{SENSOR_TYPES[self._sensor_type]['key']}",)
+
     def _get_state_from_coordinator(self):
         """Fetch the state from the coordinator data."""
         
@@ -99,11 +163,6 @@ class CresSensorEntity(CoordinatorEntity, SensorEntity):
         normalized_device_id = self._device.device_id.lower()
         return f"{normalized_device_id.capitalize()} {self._sensor_type.capitalize()}"
 
-    @property
-    def state(self):
-        
-        return self._get_state_from_coordinator()
-
     @property
     def unit_of_measurement(self):
         return SENSOR_TYPES[self._sensor_type]["unit"]
@@ -123,28 +182,33 @@ class CresSensorEntity(CoordinatorEntity, SensorEntity):
         )
 # Input Voltage Entity
 
-class CresInputVoltageEntity(CoordinatorEntity, SensorEntity):
+class CresInputVoltageEntity(CresMeasurementEntity):
     def __init__(self, device, coordinator, entry):
         super().__init__(coordinator)
         self._device = device
+        self._measurement = "voltage"
         self._entry = entry
 
     @property
     def unique_id(self):
         normalized_device_id = self._device.device_id.lower()
-        return f"crescontrol_input_{normalized_device_id}_voltage"
+        return self._unit_id(f"crescontrol_input_{normalized_device_id}_voltage")
 
     @property
     def device_info(self):
         normalized_device_id = self._device.device_id.lower()
         return {
-            "identifiers": {(DOMAIN, f"{DOMAIN}_input_{normalized_device_id}")},
-            "name": f"Input {normalized_device_id.upper()}",
+            "identifiers": {(DOMAIN, self._unit_id(f"{DOMAIN}_input_{normalized_device_id}"))},
+            "name": self._unit_name(f"Input {normalized_device_id.upper()}"),
             "manufacturer": "cre.sience",
             "model": "CresControl Input",
             "sw_version": "1.0",
         }
 
+    @property
+    def poll_keys(self):
+        return (f"in-{self._device.device_id}:voltage",)
+
     def _get_state_from_coordinator(self):
         """Fetch the state from the coordinator data."""
         input_data = self.coordinator.data.get("inputs", {})
@@ -158,11 +222,66 @@ class CresInputVoltageEntity(CoordinatorEntity, SensorEntity):
         return f"Input {normalized_device_id.upper()} Voltage"
 
     @property
-    def state(self):
-        state = self._get_state_from_coordinator()
-        _LOGGER.debug(f"Getting voltage state for {self._device.device_id}, state: {state}")
-        return state
+    def unit_of_measurement(self):
+        return "V"
+
+
+# Request Statistics Entity
+
+class CresRequestStatsEntity(CresEntity, SensorEntity):
+    """Diagnostic sensor over the request statistics of the controller."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, stat_type, coordinator, entry):
+        super().__init__(coordinator)
+        self._stat_type = stat_type
+        self._entry = entry
+
+    @property
+    def unique_id(self):
+        return self._unit_id(f"crescontrol_request_{self._stat_type}_{self._entry.entry_id}")
+
+    @property
+    def device_info(self):
+        return {
+            "identifiers": {(DOMAIN, self._unit_id(f"{DOMAIN}_controller_{self._entry.entry_id}"))},
+            "name": self._unit_name("CresControl"),
+            "manufacturer": "cre.sience",
+            "model": self.coordinator.controller.firmware_type or "CresControl",
+            "sw_version": "1.0",
+        }
+
+    @property
+    def name(self):
+        return f"CresControl {REQUEST_STAT_TYPES[self._stat_type]['name']}"
 
     @property
     def unit_of_measurement(self):
-        return "V"
+        return REQUEST_STAT_TYPES[self._stat_type]["unit"]
+
+    @property
+    def icon(self):
+        return REQUEST_STAT_TYPES[self._stat_type]["icon"]
+
+    @property
+    def state(self):
+        stats = self.coordinator.controller.req.stats
+        if self._stat_type == "latency_p50":
+            value = stats.latency_percentile(50)
+        elif self._stat_type == "latency_p95":
+            value = stats.latency_percentile(95)
+        elif self._stat_type == "error_rate":
+            value = stats.error_rate()
+        elif self._stat_type == "schedule_lag":
+            schedule_stats = self.coordinator.schedule_stats
+            value = schedule_stats["lag_ms"] if schedule_stats else None
+        else:
+            value = stats.requests_per_minute()
+        return None if value is None else round(value, 1)
+
+    @property
+    def available(self):
+        # Stay available while the controller fails, that is when these matter
+        return True
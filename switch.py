@@ -1,26 +1,35 @@
+import asyncio
 import logging
 from homeassistant.components.switch import SwitchEntity
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from .const import DOMAIN
+from .coordinator import entry_coordinators
+from .cres_control import DeviceType
+from .entity import CresEntity
 
 _LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup_entry(hass, entry, async_add_entities):
-    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    switches = []
+    for coordinator in entry_coordinators(hass, entry):
+        switches.extend(_create_switches(coordinator, entry))
+    async_add_entities(switches)
+
+
+def _create_switches(coordinator, entry):
     switches = []
 
 
-    for switch_name in ["12v", "24v-a", "24v-b"]:
+    for switch_name in coordinator.controller.switches.devices:
         device_id = f"{DOMAIN}_{switch_name}_device"
         switches.append(CresSwitchEntity(coordinator, switch_name, entry, device_id))
         switches.append(
             CresSwitchPWMEnabledEntity(coordinator, switch_name, entry, device_id)
         )
 
-    for output_name in ["a", "b", "c", "d", "e", "f"]:
+    for output_name in coordinator.controller.outputs.devices:
         device_id = f"{DOMAIN}_{output_name}_device"
-        if output_name in ["a", "b"]:
+        if output_name in coordinator.controller.outputs.isPWM:
             switches.append(
                 CresSwitchPWMEnabledOutputEntity(
                     coordinator, output_name, entry, device_id
@@ -34,10 +43,10 @@ async def async_setup_entry(hass, entry, async_add_entities):
                 CresOutputSwitchEntity(coordinator, output_name, entry, device_id)
             )
 
-    async_add_entities(switches)
+    return switches
 
 
-class CresSwitchEntity(CoordinatorEntity, SwitchEntity):
+class CresSwitchEntity(CresEntity, SwitchEntity):
     def __init__(self, coordinator, switch_name, entry, device_id):
         super().__init__(coordinator)
         self._switch_name = switch_name
@@ -46,9 +55,13 @@ class CresSwitchEntity(CoordinatorEntity, SwitchEntity):
         self._entry = entry
         self._device_id = device_id
 
+    @property
+    def poll_keys(self):
+        return (f"switch-{self._switch_name}:enabled", f"switch-{self._switch_name}:pwm-frequency")
+
     @property
     def unique_id(self):
-        return f"crescontrol_switch_{self._switch_name}_{self._entry.entry_id}"
+        return self._unit_id(f"crescontrol_switch_{self._switch_name}_{self._entry.entry_id}")
 
     @property
     def name(self):
@@ -57,8 +70,8 @@ class CresSwitchEntity(CoordinatorEntity, SwitchEntity):
     @property
     def device_info(self):
         return {
-            "identifiers": {(DOMAIN, self._device_id)},
-            "name": f"CresControl {self._switch_name.capitalize()}",
+            "identifiers": {(DOMAIN, self._unit_id(self._device_id))},
+            "name": self._unit_name(f"CresControl {self._switch_name.capitalize()}"),
             "manufacturer": "cre.sience",
             "model": "Switch",
             "sw_version": "1.0",
@@ -80,44 +93,39 @@ class CresSwitchEntity(CoordinatorEntity, SwitchEntity):
     @property
     def extra_state_attributes(self):
         return {
+            **(super().extra_state_attributes or {}),
             "pwm_frequency": self.coordinator.data["switches"]
             .get(self._switch_name, {})
             .get("pwm-frequency", 0)
         }
 
     async def async_turn_on(self, **kwargs):
-        await self.coordinator.controller.switches.set_switch_enabled(
-            self._switch_name, True
-        )
-        await self.coordinator.async_request_refresh()  
-        self.async_write_ha_state()  
+        await self.coordinator.async_write(f"switch-{self._switch_name}:enabled", True, debounce=False)
         _LOGGER.debug(f"Switch {self._switch_name} turned on.")
 
     async def async_turn_off(self, **kwargs):
-        await self.coordinator.controller.switches.set_switch_enabled(
-            self._switch_name, False
-        )
-        await self.coordinator.async_request_refresh()  
-        self.async_write_ha_state()  
+        await self.coordinator.async_write(f"switch-{self._switch_name}:enabled", False, debounce=False)
         _LOGGER.debug(f"Switch {self._switch_name} turned off.")
 
     async def async_set_value(self, value: float):
-        await self.coordinator.controller.switches.set_duty_cycle(self._switch_name, value)
-        await self.coordinator.async_request_refresh()  
-        self.async_write_ha_state()  
+        await self.coordinator.async_write(f"switch-{self._switch_name}:duty-cycle", value)
 
 
-class CresSwitchPWMEnabledEntity(CoordinatorEntity, SwitchEntity):
+class CresSwitchPWMEnabledEntity(CresEntity, SwitchEntity):
     def __init__(self, coordinator, switch_name, entry, device_id):
         super().__init__(coordinator)
         self._switch_name = switch_name
         self._entry = entry
         self._device_id = device_id
 
+    @property
+    def poll_keys(self):
+        return (f"switch-{self._switch_name}:pwm-enabled", f"switch-{self._switch_name}:duty-cycle")
+
     @property
     def unique_id(self):
         return (
-            f"crescontrol_switch_{self._switch_name}_pwm_enabled_{self._entry.entry_id}"
+            self._unit_id(f"crescontrol_switch_{self._switch_name}_pwm_enabled_{self._entry.entry_id}")
         )
 
     @property
@@ -127,8 +135,8 @@ class CresSwitchPWMEnabledEntity(CoordinatorEntity, SwitchEntity):
     @property
     def device_info(self):
         return {
-            "identifiers": {(DOMAIN, self._device_id)},
-            "name": f"CresControl {self._switch_name.capitalize()}",
+            "identifiers": {(DOMAIN, self._unit_id(self._device_id))},
+            "name": self._unit_name(f"CresControl {self._switch_name.capitalize()}"),
             "manufacturer": "cre.sience",
             "model": "Switch PWM",
             "sw_version": "1.0",
@@ -137,6 +145,7 @@ class CresSwitchPWMEnabledEntity(CoordinatorEntity, SwitchEntity):
     @property
     def extra_state_attributes(self):
         return {
+            **(super().extra_state_attributes or {}),
             "duty_cycle": self.coordinator.data["switches"]
             .get(self._switch_name, {})
             .get("duty-cycle", 0),
@@ -155,34 +164,35 @@ class CresSwitchPWMEnabledEntity(CoordinatorEntity, SwitchEntity):
         return "mdi:toggle-switch"
 
     async def async_turn_on(self, **kwargs):
-        await self.coordinator.controller.switches.set_pwm_enabled(self._switch_name, True)
-        await self.coordinator.controller.switches.set_switch_enabled(self._switch_name, False)
-        await self.coordinator.async_request_refresh()  
-        self.async_write_ha_state()  
+        # Both keys go out in the same command
+        await asyncio.gather(
+            self.coordinator.async_write(f"switch-{self._switch_name}:pwm-enabled", True, debounce=False),
+            self.coordinator.async_write(f"switch-{self._switch_name}:enabled", False, debounce=False),
+        )
         _LOGGER.debug(f"PWM for switch {self._switch_name} enabled.")
 
     async def async_turn_off(self, **kwargs):
-        await self.coordinator.controller.switches.set_pwm_enabled(self._switch_name, False)
-        await self.coordinator.async_request_refresh()  
-        self.async_write_ha_state()  
+        await self.coordinator.async_write(f"switch-{self._switch_name}:pwm-enabled", False, debounce=False)
         _LOGGER.debug(f"PWM for switch {self._switch_name} disabled.")
 
     async def async_set_value(self, value: float):
-        await self.coordinator.controller.switches.set_pwm_frequency(self._switch_name, value)
-        await self.coordinator.async_update_single_device(self._device_id)
-        self.async_write_ha_state()  # Zustand der Entität nach der Änderung aktualisieren
+        await self.coordinator.async_write(f"switch-{self._switch_name}:pwm-frequency", value)
 
 
-class CresOutputSwitchEntity(CoordinatorEntity, SwitchEntity):
+class CresOutputSwitchEntity(CresEntity, SwitchEntity):
     def __init__(self, coordinator, output_name, entry, device_id):
         super().__init__(coordinator)
         self._switch_name = output_name
         self._entry = entry
         self._device_id = device_id
 
+    @property
+    def poll_keys(self):
+        return (f"out-{self._switch_name}:enabled",)
+
     @property
     def unique_id(self):
-        return f"crescontrol_output_{self._switch_name}_switch_{self._entry.entry_id}"
+        return self._unit_id(f"crescontrol_output_{self._switch_name}_switch_{self._entry.entry_id}")
 
     @property
     def name(self):
@@ -193,8 +203,8 @@ class CresOutputSwitchEntity(CoordinatorEntity, SwitchEntity):
         """Return device information about this entity, grouped with output-related devices."""
         device_id = f"{DOMAIN}_output_{self._switch_name}_device"
         return {
-            "identifiers": {(DOMAIN, device_id)},
-            "name": f"CresControl Output {self._switch_name.capitalize()}",
+            "identifiers": {(DOMAIN, self._unit_id(device_id))},
+            "name": self._unit_name(f"CresControl Output {self._switch_name.capitalize()}"),
             "manufacturer": "cre.sience",
             "model": "Output Switch",
             "sw_version": "1.0",
@@ -215,35 +225,31 @@ class CresOutputSwitchEntity(CoordinatorEntity, SwitchEntity):
     @property
     def extra_state_attributes(self):
         return {
+            **(super().extra_state_attributes or {}),
             "pwm_frequency": self.coordinator.data["outputs"]
             .get(self._switch_name, {})
             .get("pwm-frequency", 0)
         }
 
     async def async_turn_on(self, **kwargs):
-        await self.coordinator.controller.outputs.set_output_enabled(
-            self._switch_name, True
-        )
-        await self.coordinator.async_request_refresh()
+        await self.coordinator.async_write(f"out-{self._switch_name}:enabled", True, debounce=False)
         _LOGGER.debug(
             f"Turned on output {self._switch_name}, current data: {self.coordinator.data['outputs'].get(self._switch_name)}"
         )
 
     async def async_turn_off(self, **kwargs):
-        await self.coordinator.controller.outputs.set_output_enabled(
-            self._switch_name, False
-        )
-        await self.coordinator.async_request_refresh()
+        await self.coordinator.async_write(f"out-{self._switch_name}:enabled", False, debounce=False)
         _LOGGER.debug(
             f"Turned off output {self._switch_name}, current data: {self.coordinator.data['outputs'].get(self._switch_name)}"
         )
 
     async def async_set_value(self, value: float):
-        await self.coordinator.async_update_single_device(self._device_id)
-        self.async_write_ha_state() 
+        await self.coordinator.async_update_single_device(
+            self._switch_name, DeviceType.OUTPUT, ("enabled",)
+        )
 
 
-class CresSwitchPWMEnabledOutputEntity(CoordinatorEntity, SwitchEntity):
+class CresSwitchPWMEnabledOutputEntity(CresEntity, SwitchEntity):
     def __init__(self, coordinator, output_name, entry, device_id):
         super().__init__(coordinator)
         self._switch_name = output_name
@@ -251,10 +257,14 @@ class CresSwitchPWMEnabledOutputEntity(CoordinatorEntity, SwitchEntity):
         self._entry = entry
         self._device_id = device_id
 
+    @property
+    def poll_keys(self):
+        return (f"out-{self._switch_name}:pwm-enabled",)
+
     @property
     def unique_id(self):
         return (
-            f"crescontrol_output_{self._switch_name}_pwm_enabled_{self._entry.entry_id}"
+            self._unit_id(f"crescontrol_output_{self._switch_name}_pwm_enabled_{self._entry.entry_id}")
         )
 
     @property
@@ -266,8 +276,8 @@ class CresSwitchPWMEnabledOutputEntity(CoordinatorEntity, SwitchEntity):
         """Return device information about this entity, grouped with output-related devices."""
         device_id = f"{DOMAIN}_output_{self._switch_name}_device"
         return {
-            "identifiers": {(DOMAIN, device_id)},
-            "name": f"CresControl Output {self._switch_name.capitalize()}",
+            "identifiers": {(DOMAIN, self._unit_id(device_id))},
+            "name": self._unit_name(f"CresControl Output {self._switch_name.capitalize()}"),
             "manufacturer": "cre.sience",
             "model": "Output PWM",
             "sw_version": "1.0",
@@ -276,6 +286,7 @@ class CresSwitchPWMEnabledOutputEntity(CoordinatorEntity, SwitchEntity):
     @property
     def extra_state_attributes(self):
         return {
+            **(super().extra_state_attributes or {}),
             "duty_cycle": self.coordinator.data["outputs"]
             .get(self._switch_name, {})
             .get("duty-cycle", 0)
@@ -294,19 +305,14 @@ class CresSwitchPWMEnabledOutputEntity(CoordinatorEntity, SwitchEntity):
         return "mdi:toggle-switch"
 
     async def async_turn_on(self, **kwargs):
-        await self.coordinator.controller.outputs.set_output_pwm_enabled(
-            self._switch_name, True
-        )
-        await self.coordinator.async_request_refresh()
+        await self.coordinator.async_write(f"out-{self._switch_name}:pwm-enabled", True, debounce=False)
         _LOGGER.debug(f"PWM for output {self._switch_name} enabled.")
 
     async def async_turn_off(self, **kwargs):
-        await self.coordinator.controller.outputs.set_output_pwm_enabled(
-            self._switch_name, False
-        )
-        await self.coordinator.async_request_refresh()
+        await self.coordinator.async_write(f"out-{self._switch_name}:pwm-enabled", False, debounce=False)
         _LOGGER.debug(f"PWM for output {self._switch_name} disabled.")
 
     async def async_set_value(self, value: float):
-        await self.coordinator.async_update_single_device(self._device_id)
-        self.async_write_ha_state()  
+        await self.coordinator.async_update_single_device(
+            self._switch_name, DeviceType.OUTPUT, ("pwm-enabled",)
+        )
@@ -0,0 +1,24 @@
+"""Unit tests against the local simulator in tools/simulator.py.
+
+Importing the integration imports Home Assistant, so install
+requirements_test.txt first and run `python -m pytest` from the
+integration's directory.
+"""
+
+import asyncio
+
+from ..tools.simulator import CresSimulator
+
+
+def run_with_simulator(scenario, **options):
+    """Run `await scenario(simulator)` against a started simulator."""
+
+    async def main():
+        simulator = CresSimulator(seed=1, **options)
+        await simulator.start()
+        try:
+            return await scenario(simulator)
+        finally:
+            await simulator.stop()
+
+    return asyncio.run(main())
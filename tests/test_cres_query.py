@@ -0,0 +1,59 @@
+from . import run_with_simulator
+from ..cres_breaker import BreakerState
+from ..cres_query import QUERY_PATH, QueryCompiler
+from ..cres_req import CresRequest
+
+KEYS = [f"out-{name}:voltage" for name in "abcdef"] + ["in-a:voltage", "in-b:voltage"]
+
+
+def test_compile_keeps_batches_within_the_url_budget():
+    compiler = QueryCompiler(CresRequest("127.0.0.1:1"), max_url_length=len(QUERY_PATH) + 30)
+    batches = compiler.compile(KEYS)
+    assert len(batches) > 1
+    assert [key for batch in batches for key in batch] == KEYS
+    assert all(len(";".join(batch)) <= 30 for batch in batches)
+
+
+def test_unknown_key_is_recorded_and_left_out_of_later_batches():
+    async def scenario(simulator):
+        req = CresRequest(simulator.address, cache_ttl=0)
+        compiler = QueryCompiler(req)
+        try:
+            values = await compiler.fetch(KEYS + ["out-z:voltage"])
+            simulator.reset_stats()
+            await compiler.fetch(KEYS + ["out-z:voltage"])
+        finally:
+            await req.close()
+        assert set(values) == set(KEYS)
+        assert not req.capabilities.is_supported("out-z:voltage")
+        assert simulator.stats["keys"] == len(KEYS)
+
+    run_with_simulator(scenario)
+
+
+def test_rejected_batch_is_bisected():
+    async def scenario(simulator):
+        req = CresRequest(simulator.address, cache_ttl=0)
+        try:
+            values = await QueryCompiler(req).fetch(KEYS)
+        finally:
+            await req.close()
+        assert set(values) == set(KEYS)
+        assert simulator.stats["rejected"] > 0
+
+    # The whole batch exceeds the URI limit (414), its halves do not
+    run_with_simulator(scenario, max_uri_length=len(QUERY_PATH) + 60)
+
+
+def test_oversized_response_is_bisected_without_tripping_the_breaker():
+    async def scenario(simulator):
+        req = CresRequest(simulator.address, cache_ttl=0)
+        try:
+            values = await QueryCompiler(req).fetch(KEYS)
+        finally:
+            await req.close()
+        assert set(values) == set(KEYS)
+        assert simulator.stats["rejected"] > 0
+        assert req.breaker.state == BreakerState.CLOSED
+
+    run_with_simulator(scenario, max_response_size=20)
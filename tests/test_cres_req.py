@@ -0,0 +1,62 @@
+import asyncio
+
+from . import run_with_simulator
+from ..cres_req import CresRequest
+
+
+def test_identical_reads_in_flight_share_one_request():
+    async def scenario(simulator):
+        req = CresRequest(simulator.address, cache_ttl=0)
+        try:
+            answers = await asyncio.gather(*(req._get_request("out-a:voltage") for _ in range(3)))
+        finally:
+            await req.close()
+        assert len(set(answers)) == 1
+        assert simulator.stats["requests"] == 1
+        assert req.stats.coalesced == 2
+
+    run_with_simulator(scenario, latency=0.05)
+
+
+def test_answers_are_served_from_the_cache_within_ttl():
+    async def scenario(simulator):
+        req = CresRequest(simulator.address, cache_ttl=60)
+        try:
+            first = await req._get_request("out-a:voltage")
+            second = await req._get_request("out-a:voltage")
+        finally:
+            await req.close()
+        assert first == second
+        assert simulator.stats["requests"] == 1
+        assert req.stats.cache_hits == 1
+
+    run_with_simulator(scenario)
+
+
+def test_write_invalidates_cached_reads():
+    async def scenario(simulator):
+        req = CresRequest(simulator.address, cache_ttl=60)
+        try:
+            await req._get_request("out-a:voltage")
+            await req._get_request("out-a:voltage=3.3")
+            answer = await req._get_request("out-a:voltage")
+        finally:
+            await req.close()
+        assert answer == "3.30"
+        assert simulator.stats["requests"] == 3
+
+    run_with_simulator(scenario)
+
+
+def test_zero_ttl_disables_the_cache():
+    async def scenario(simulator):
+        req = CresRequest(simulator.address, cache_ttl=0)
+        try:
+            await req._get_request("out-a:voltage")
+            await req._get_request("out-a:voltage")
+        finally:
+            await req.close()
+        assert simulator.stats["requests"] == 2
+        assert req.stats.cache_hits == 0
+
+    run_with_simulator(scenario)
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from . import run_with_simulator
+from ..cres_query import QUERY_PATH
+from ..cres_req import CresRequest
+from ..cres_writes import WriteBuffer
+
+
+class _FailingSecondCommand(CresRequest):
+    """Fails the second write command, as a dropped connection would."""
+
+    writes = 0
+
+    async def _get_request(self, endpoint):
+        if "=" in endpoint:
+            self.writes += 1
+            if self.writes == 2:
+                raise ConnectionError("connection lost")
+        return await super()._get_request(endpoint)
+
+
+def _recorder(flushes):
+    async def on_flush(sent, answers):
+        flushes.append((dict(sent), answers))
+
+    return on_flush
+
+
+def test_debounced_writes_flush_once_with_the_last_value():
+    async def scenario(simulator):
+        req = CresRequest(simulator.address, cache_ttl=0)
+        buffer = WriteBuffer(req, delay=0.05, max_delay=1)
+        try:
+            answers = await asyncio.gather(
+                buffer.write("out-a:voltage", 1.0),
+                buffer.write("out-a:voltage", 2.0),
+                buffer.write("out-a:voltage", 3.0),
+                buffer.write("out-b:voltage", 4.0),
+            )
+        finally:
+            await req.close()
+        assert simulator.stats["requests"] == 1
+        assert simulator.settings["out-a:voltage"] == 3.0
+        assert answers == ["3.00", "3.00", "3.00", "4.00"]
+
+    run_with_simulator(scenario)
+
+
+def test_write_without_debounce_is_sent_at_once():
+    async def scenario(simulator):
+        req = CresRequest(simulator.address, cache_ttl=0)
+        buffer = WriteBuffer(req, delay=10, max_delay=10)
+        try:
+            answer = await asyncio.wait_for(buffer.write("switch-12v:enabled", True, debounce=False), 1)
+        finally:
+            await req.close()
+        assert answer == "1"
+        assert simulator.settings["switch-12v:enabled"] is True
+
+    run_with_simulator(scenario)
+
+
+def test_failed_flush_reports_no_answers():
+    async def scenario():
+        flushes = []
+        # Nothing listens on port 1, the command fails
+        req = CresRequest("127.0.0.1:1", cache_ttl=0)
+        buffer = WriteBuffer(req, on_flush=_recorder(flushes), delay=0)
+        try:
+            with pytest.raises(Exception):
+                await buffer.write("out-a:voltage", 1.0)
+        finally:
+            await req.close()
+        assert flushes == [({"out-a:voltage": "1.0"}, None)]
+
+    asyncio.run(scenario())
+
+
+def test_split_flush_confirms_the_commands_sent_before_a_failure():
+    async def scenario(simulator):
+        flushes = []
+        req = _FailingSecondCommand(simulator.address, cache_ttl=0)
+        buffer = WriteBuffer(req, on_flush=_recorder(flushes), delay=0)
+        # One key per command
+        buffer._compiler.max_url_length = len(QUERY_PATH) + 20
+        try:
+            results = await asyncio.gather(
+                buffer.write("out-a:voltage", 1.5),
+                buffer.write("out-b:voltage", 2.5),
+                return_exceptions=True,
+            )
+        finally:
+            await req.close()
+        assert results[0] == "1.50"
+        assert isinstance(results[1], ConnectionError)
+        assert flushes == [
+            ({"out-a:voltage": "1.5"}, {"out-a:voltage": "1.50"}),
+            ({"out-b:voltage": "2.5"}, None),
+        ]
+        assert simulator.settings["out-a:voltage"] == 1.5
+
+    run_with_simulator(scenario)
@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+from homeassistant.core import HomeAssistant
+
+from . import run_with_simulator
+from ..coordinator import FAST_TIERS, ExampleCoordinator
+from ..cres_control import CresControl
+from ..fan import CresFanEntity
+
+
+def test_fan_speed_change_keeps_the_minimum_and_the_slow_tier(tmp_path):
+    async def scenario(simulator):
+        hass = HomeAssistant(str(tmp_path))
+        entry = SimpleNamespace(entry_id="fan", unique_id="fan", data={"host": simulator.address}, options={})
+        controller = CresControl(simulator.address, cache_ttl=0)
+        coordinator = ExampleCoordinator(hass, entry, controller)
+        try:
+            await coordinator.async_refresh()
+            assert coordinator.last_update_success
+            # Changed on the controller after the last slow poll
+            simulator.settings["fan:duty-cycle-min"] = 35.0
+
+            await CresFanEntity(coordinator, entry.entry_id).async_set_percentage(55)
+
+            assert simulator.settings["fan:duty-cycle"] == 55.0
+            assert simulator.settings["fan:duty-cycle-min"] == 35.0
+            assert coordinator._poll_tiers() is FAST_TIERS
+        finally:
+            await coordinator.writes.close()
+            await controller.close()
+            await hass.async_stop(force=True)
+
+    run_with_simulator(scenario)
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from ..scheduler import PollScheduler
+
+
+class _Hass:
+    """Just what PollScheduler needs from HomeAssistant."""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.tasks = set()
+
+    def async_create_background_task(self, target, name):
+        task = self.loop.create_task(target, name=name)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+
+class _Coordinator:
+    """Just what PollScheduler needs from an ExampleCoordinator."""
+
+    def __init__(self, host, poll_interval):
+        self.host = host
+        self.poll_interval = poll_interval
+        self.schedule_stats = None
+        self.refreshed_at = []
+
+    async def async_refresh(self):
+        self.refreshed_at.append(asyncio.get_running_loop().time())
+
+
+def test_phases_are_spread_over_the_interval():
+    async def scenario():
+        hass = _Hass()
+        scheduler = PollScheduler(hass)
+        coordinators = [_Coordinator(f"host-{index}", 0.4) for index in range(4)]
+        try:
+            for coordinator in coordinators:
+                scheduler.add(coordinator)
+            assert [c.schedule_stats["phase"] for c in coordinators] == pytest.approx([0.0, 0.1, 0.2, 0.3])
+
+            await asyncio.sleep(0.5)
+            # Every coordinator polled, a quarter interval apart from the next
+            first_polls = sorted(c.refreshed_at[0] for c in coordinators)
+            gaps = [b - a for a, b in zip(first_polls, first_polls[1:])]
+            assert gaps == pytest.approx([0.1, 0.1, 0.1], abs=0.03)
+            assert all(c.schedule_stats["lag_ms"] is not None for c in coordinators)
+        finally:
+            for coordinator in coordinators:
+                scheduler.remove(coordinator)
+            await asyncio.gather(*hass.tasks)
+        assert len(scheduler) == 0
+
+    asyncio.run(scenario())
+
+
+def test_removing_a_coordinator_rebalances_the_rest():
+    async def scenario():
+        hass = _Hass()
+        scheduler = PollScheduler(hass)
+        coordinators = [_Coordinator(f"host-{index}", 1.0) for index in range(4)]
+        try:
+            for coordinator in coordinators:
+                scheduler.add(coordinator)
+            scheduler.remove(coordinators[1])
+            remaining = [c for c in coordinators if c is not coordinators[1]]
+            assert [c.schedule_stats["phase"] for c in remaining] == pytest.approx([0.0, 1 / 3, 2 / 3])
+        finally:
+            for coordinator in coordinators:
+                scheduler.remove(coordinator)
+            await asyncio.gather(*hass.tasks)
+
+    asyncio.run(scenario())
@@ -0,0 +1,15 @@
+import pytest
+
+from ..sensor import CresMeasurementEntity
+
+
+def test_measurement_entity_needs_a_reading():
+    class _NoReading(CresMeasurementEntity):
+        pass
+
+    # Entity's metaclass is ABC-based and refuses the incomplete subclass
+    with pytest.raises(TypeError, match="abstract"):
+        _NoReading(None)
+    # The base method raises for subclasses that call it anyway
+    with pytest.raises(NotImplementedError):
+        CresMeasurementEntity._get_state_from_coordinator(None)
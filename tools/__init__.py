@@ -0,0 +1 @@
+"""Development tools for the CresControl integration (simulator, benchmarks)."""
@@ -0,0 +1,322 @@
+"""Poll-cycle benchmarks against the local simulator.
+
+    python -m crescontrol.tools.benchmark --output bench.json
+    python -m crescontrol.tools.benchmark --baseline bench.json
+
+Each scenario reports HTTP requests per cycle, wall-clock latency
+percentiles, CPU time spent in PollSchema.parse, traced allocations per
+cycle and, for the coordinator scenario, entity state writes per cycle.
+The run fails (exit code 1) if a metric exceeds its threshold in
+benchmark_thresholds.json or regresses beyond the tolerance against a
+baseline result file.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from .simulator import CresSimulator
+from ..cres_control import CresControl
+from ..cres_schema import ALL_TIERS, PollTier
+
+_LOGGER = logging.getLogger(__name__)
+
+THRESHOLDS_FILE = os.path.join(os.path.dirname(__file__), "benchmark_thresholds.json")
+FAST_TIERS = frozenset({PollTier.FAST})
+PLATFORMS = ("sensor", "fan", "switch", "number")
+
+# Metrics where a lower value is better, with the absolute slack that keeps
+# near-zero values from failing on noise. Latency is left out of the baseline
+# comparison because it mostly measures the machine.
+COMPARED_METRICS = {
+    "requests_per_cycle": 0.01,
+    "parse_cpu_ms": 0.05,
+    "alloc_kib_per_cycle": 16,
+    "retained_kib_per_cycle": 1,
+    "state_writes_per_cycle": 0.5,
+}
+
+
+def _percentile(samples, percent):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _parse_time(controller):
+    return sum(subsystem.schema.last_parse_time for subsystem in controller._subsystems())
+
+
+def _reset_parse_time(controller):
+    for subsystem in controller._subsystems():
+        subsystem.schema.last_parse_time = 0.0
+
+
+async def _measure(simulator, cycles, run_cycle, controller, writes=None):
+    """Run `run_cycle` `cycles` times and collect the per-cycle metrics.
+
+    `controller` returns the controller the cycle parsed with, `writes` the
+    coordinator's state write counter.
+    """
+    latencies = []
+    parse_times = []
+    simulator.reset_stats()
+    writes_before = writes() if writes else 0
+
+    for _ in range(cycles):
+        start = time.perf_counter()
+        await run_cycle()
+        latencies.append((time.perf_counter() - start) * 1000)
+        parse_times.append(_parse_time(controller()) * 1000)
+        _reset_parse_time(controller())
+
+    result = {
+        "cycles": cycles,
+        "requests_per_cycle": simulator.stats["requests"] / cycles,
+        "keys_per_cycle": simulator.stats["keys"] / cycles,
+        "bytes_per_cycle": simulator.stats["bytes_sent"] / cycles,
+        "latency_ms": {
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99),
+            "max": max(latencies),
+        },
+        "parse_cpu_ms": statistics.fmean(parse_times),
+    }
+    if writes:
+        result["state_writes_per_cycle"] = (writes() - writes_before) / cycles
+
+    # Allocations are traced in a separate pass so tracing does not skew latency.
+    # The peak above the starting point is what a cycle allocates at once
+    # (the in-process simulator included), the growth is what it leaves behind.
+    peaks = []
+    tracemalloc.start()
+    try:
+        start_size = tracemalloc.get_traced_memory()[0]
+        for _ in range(cycles):
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            await run_cycle()
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+        end_size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    result["alloc_kib_per_cycle"] = statistics.fmean(peaks) / 1024
+    result["retained_kib_per_cycle"] = (end_size - start_size) / 1024 / cycles
+    return result
+
+
+# Benchmark controllers do not cache reads, back-to-back cycles would
+# otherwise be answered from the cache instead of measuring the poll
+NO_CACHE = 0
+
+
+async def bench_init_devices(simulator, cycles):
+    """A fresh controller discovering the device and reading everything once."""
+    controllers = []
+
+    async def run_cycle():
+        controller = CresControl(simulator.address, cache_ttl=NO_CACHE)
+        controllers.append(controller)
+        await controller.init_devices()
+
+    try:
+        return await _measure(simulator, cycles, run_cycle, lambda: controllers[-1])
+    finally:
+        for controller in controllers:
+            await controller.close()
+
+
+async def bench_update_all(simulator, cycles, tiers):
+    """Steady-state polls of an initialized controller."""
+    controller = CresControl(simulator.address, cache_ttl=NO_CACHE)
+    try:
+        await controller.init_devices()
+
+        async def run_cycle():
+            await controller.update_all(tiers)
+
+        return await _measure(simulator, cycles, run_cycle, lambda: controller)
+    finally:
+        await controller.close()
+
+
+async def _add_platform_entities(hass, entry):
+    """Set up the entity platforms without an entity registry.
+
+    Entities disabled by default are left out, as a fresh installation would.
+    """
+    from homeassistant.util import slugify
+
+    from .. import fan, number, sensor, switch
+
+    entities = []
+    for module in (sensor, fan, switch, number):
+        added = []
+        await module.async_setup_entry(
+            hass,
+            entry,
+            lambda new, update=False: added.extend(
+                entity for entity in new if entity.entity_registry_enabled_default
+            ),
+        )
+        platform = module.__name__.rsplit(".", 1)[-1]
+        for entity in added:
+            entity.hass = hass
+            entity.entity_id = f"{platform}.{slugify(entity.unique_id or entity.name)}"
+            await entity.async_added_to_hass()
+        entities.extend(added)
+    return entities
+
+
+async def bench_coordinator(simulator, cycles, config_dir):
+    """Coordinator refreshes including entity state writes."""
+    # Only this scenario needs Home Assistant, the others run on the
+    # transport modules alone
+    from homeassistant.const import CONF_HOST
+    from homeassistant.core import HomeAssistant
+
+    from ..const import DOMAIN
+    from ..coordinator import ExampleCoordinator
+
+    hass = HomeAssistant(config_dir)
+    entry = SimpleNamespace(
+        entry_id="benchmark",
+        unique_id=simulator.address,
+        data={CONF_HOST: simulator.address},
+        options={},
+    )
+    controller = CresControl(simulator.address, cache_ttl=NO_CACHE)
+    entities = []
+    try:
+        await controller.probe_capabilities()
+        coordinator = ExampleCoordinator(hass, entry, controller)
+        hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
+            "coordinators": {simulator.address: coordinator},
+            "session": None,
+        }
+        await coordinator.async_refresh()
+        entities = await _add_platform_entities(hass, entry)
+
+        async def run_cycle():
+            await coordinator.async_refresh()
+
+        result = await _measure(
+            simulator,
+            cycles,
+            run_cycle,
+            lambda: controller,
+            writes=lambda: coordinator.notify_stats["writes"],
+        )
+        result["entities"] = len(entities)
+        return result
+    finally:
+        for entity in entities:
+            await entity.async_remove()
+        await controller.close()
+        await hass.async_stop(force=True)
+
+
+async def run_benchmarks(cycles=50, latency=0.0, seed=1, config_dir=None):
+    simulator = CresSimulator(latency=latency, seed=seed)
+    await simulator.start()
+    try:
+        results = {
+            "init_devices": await bench_init_devices(simulator, max(1, cycles // 5)),
+            "update_all": await bench_update_all(simulator, cycles, ALL_TIERS),
+            "update_all_fast": await bench_update_all(simulator, cycles, FAST_TIERS),
+        }
+        try:
+            results["coordinator_refresh"] = await bench_coordinator(
+                simulator, cycles, config_dir or os.getcwd()
+            )
+        except ImportError as e:
+            _LOGGER.warning(f"Home Assistant ist nicht verfügbar ({e}), Coordinator-Benchmark übersprungen")
+    finally:
+        await simulator.stop()
+    return {
+        "meta": {"cycles": cycles, "latency": latency, "seed": seed, "python": sys.version.split()[0]},
+        "results": results,
+    }
+
+
+def _metric(result, name):
+    if name.startswith("latency_ms."):
+        return result["latency_ms"].get(name.split(".", 1)[1])
+    return result.get(name)
+
+
+def check_thresholds(report, thresholds):
+    """Return a failure message for every metric above its threshold."""
+    failures = []
+    for scenario, limits in thresholds.items():
+        result = report["results"].get(scenario)
+        if result is None:
+            continue
+        for name, limit in limits.items():
+            value = _metric(result, name)
+            if value is not None and value > limit:
+                failures.append(f"{scenario}.{name}: {value:.3f} > {limit}")
+    return failures
+
+
+def compare_baseline(report, baseline, tolerance):
+    """Return a failure message for every metric that regressed against baseline."""
+    failures = []
+    for scenario, result in report["results"].items():
+        previous = baseline.get("results", {}).get(scenario)
+        if previous is None:
+            continue
+        for name, slack in COMPARED_METRICS.items():
+            value, before = result.get(name), previous.get(name)
+            if value is None or before is None:
+                continue
+            if value > before * (1 + tolerance) + slack:
+                failures.append(f"{scenario}.{name}: {value:.3f} (baseline {before:.3f})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CresControl poll cycles against the simulator.")
+    parser.add_argument("--cycles", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated seconds per request")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--thresholds", default=THRESHOLDS_FILE)
+    parser.add_argument("--baseline", help="previous JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    # Entities are added without an entity platform, which Home Assistant warns about
+    logging.getLogger("homeassistant").setLevel(logging.ERROR)
+
+    report = asyncio.run(run_benchmarks(args.cycles, args.latency, args.seed))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    failures = []
+    if args.thresholds and os.path.exists(args.thresholds):
+        with open(args.thresholds, encoding="utf-8") as file:
+            failures += check_thresholds(report, json.load(file))
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            failures += compare_baseline(report, json.load(file), args.tolerance)
+
+    for failure in failures:
+        print(f"REGRESSION {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
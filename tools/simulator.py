@@ -0,0 +1,343 @@
+"""Local stand-in for a CresControl that speaks the /command?query= protocol.
+
+Run it with `python -m crescontrol.tools.simulator --port 8080` from the
+custom_components directory and add 127.0.0.1:8080 as a controller, or
+start it from a benchmark with `await CresSimulator().start()`.
+"""
+
+import argparse
+import asyncio
+import logging
+import math
+import random
+import time
+
+from aiohttp import web
+
+_LOGGER = logging.getLogger(__name__)
+
+OUTPUTS = ["a", "b", "c", "d", "e", "f"]
+PWM_OUTPUTS = ["a", "b"]
+INPUTS = ["a", "b"]
+SWITCHES = ["12v", "24v-a", "24v-b"]
+DEFAULT_EXTENSIONS = {"co2-sensor-1": True, "climate-sensor-1": False}
+
+SYSTEM_VALUES = {
+    "system:cpu-id": "a4cf12f00e5c",
+    "system:reset-cause": "power-on",
+    "system:debugging-enabled": "0",
+    "system:frequency": "240",
+    "system:rescue-mode": "0",
+    "system:heap:size": "327680",
+    "system:heap:free": "154112",
+    "system:heap:largest-block": "110580",
+    "system:heap:watermark": "98304",
+    "system:serial:enabled": "1",
+    "system:serial:baudrate": "115200",
+}
+
+
+def _format(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+
+def _parse_value(current, raw):
+    if isinstance(current, bool):
+        if raw.lower() in ("1", "true"):
+            return True
+        if raw.lower() in ("0", "false"):
+            return False
+        raise ValueError(raw)
+    if isinstance(current, float):
+        return float(raw)
+    return raw
+
+
+class _CountedProtocol(asyncio.Protocol):
+    """Hand a TCP connection to aiohttp, or reset it past the simulator's limit."""
+
+    def __init__(self, simulator, protocol):
+        self._simulator = simulator
+        self._protocol = protocol
+        self._transport = None
+
+    def connection_made(self, transport):
+        simulator = self._simulator
+        connections = simulator._open_connections
+        if simulator.max_connections is not None and len(connections) >= simulator.max_connections:
+            simulator.stats["refused_connections"] += 1
+            transport.abort()
+            return
+        self._transport = transport
+        connections.add(transport)
+        simulator.stats["peak_connections"] = max(simulator.stats["peak_connections"], len(connections))
+        self._protocol.connection_made(transport)
+
+    def connection_lost(self, exc):
+        if self._transport is None:
+            return
+        self._simulator._open_connections.discard(self._transport)
+        self._protocol.connection_lost(exc)
+
+    def data_received(self, data):
+        self._protocol.data_received(data)
+
+    def eof_received(self):
+        return self._protocol.eof_received()
+
+    def pause_writing(self):
+        self._protocol.pause_writing()
+
+    def resume_writing(self):
+        self._protocol.resume_writing()
+
+
+class CresSimulator:
+    """A simulated controller with writable settings and drifting sensors.
+
+    `max_concurrent_requests` answers requests beyond the limit with 503,
+    like the controller's busy handler. `max_connections` limits open TCP
+    connections the way its small network stack does: a connection beyond
+    the limit is reset before any request is read.
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        latency=0.0,
+        jitter=0.0,
+        max_concurrent_requests=4,
+        max_connections=None,
+        max_response_size=None,
+        max_uri_length=None,
+        extensions=None,
+        firmware_type="CresControl",
+        seed=None,
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.max_concurrent_requests = max_concurrent_requests
+        self.max_connections = max_connections
+        self.max_response_size = max_response_size
+        self.max_uri_length = max_uri_length
+        self.firmware_type = firmware_type
+        self.extensions = dict(DEFAULT_EXTENSIONS if extensions is None else extensions)
+        self._random = random.Random(seed)
+        self._runner = None
+        self._server = None
+        self._open_connections = set()
+        self._in_flight = 0
+        self._started_at = time.monotonic()
+        self.settings = self._initial_settings()
+        self.stats = {}
+        self.reset_stats()
+
+    def _initial_settings(self):
+        settings = {
+            "fan:enabled": True,
+            "fan:duty-cycle": 40.0,
+            "fan:duty-cycle-min": 20.0,
+        }
+        for name in OUTPUTS:
+            settings[f"out-{name}:enabled"] = False
+            settings[f"out-{name}:voltage"] = 0.0
+            settings[f"out-{name}:calib-offset"] = 0.0
+            settings[f"out-{name}:calib-factor"] = 1.0
+            settings[f"out-{name}:threshold"] = 0.0
+        for name in PWM_OUTPUTS:
+            settings[f"out-{name}:pwm-enabled"] = False
+            settings[f"out-{name}:pwm-frequency"] = 100.0
+        for name in INPUTS:
+            settings[f"in-{name}:calib-offset"] = 0.0
+            settings[f"in-{name}:calib-factor"] = 1.0
+        for name in SWITCHES:
+            settings[f"switch-{name}:enabled"] = False
+            settings[f"switch-{name}:pwm-enabled"] = False
+            settings[f"switch-{name}:duty-cycle"] = 0.0
+            settings[f"switch-{name}:pwm-frequency"] = 200.0
+        return settings
+
+    def reset_stats(self):
+        self.stats = {
+            "requests": 0,
+            "keys": 0,
+            "writes": 0,
+            "bytes_sent": 0,
+            "rejected": 0,
+            "peak_concurrency": 0,
+            "connections": set(),
+            "peak_connections": len(self._open_connections),
+            "refused_connections": 0,
+        }
+
+    # Sensor dynamics: slow sine drift plus noise, so deadbands and change
+    # detection see realistic jitter in the last decimal
+    def _drift(self, period, amplitude, noise, phase=0.0):
+        elapsed = time.monotonic() - self._started_at
+        return amplitude * math.sin(2 * math.pi * elapsed / period + phase) + self._random.gauss(0, noise)
+
+    def _temperature(self, index):
+        return 24.0 + index * 0.5 + self._drift(600, 1.5, 0.03, index)
+
+    def _humidity(self, index):
+        return 60.0 - index + self._drift(900, 5.0, 0.1, index)
+
+    def _read(self, key):
+        if key in self.settings:
+            return _format(self.settings[key])
+        if key in SYSTEM_VALUES:
+            return SYSTEM_VALUES[key]
+        if key == "type":
+            return self.firmware_type
+        if key == "extension:get-all()":
+            return "[" + ",".join(f'"{sensor_id}"' for sensor_id in self.extensions) + "]"
+
+        parts = key.split(":")
+        if len(parts) == 2 and parts[0].startswith("in-") and parts[1] == "voltage":
+            name = parts[0][3:]
+            if name in INPUTS:
+                raw = 5.0 + self._drift(300, 2.0, 0.005, INPUTS.index(name))
+                offset = self.settings[f"in-{name}:calib-offset"]
+                factor = self.settings[f"in-{name}:calib-factor"]
+                return _format(raw * factor + offset)
+        if len(parts) == 3 and parts[0] == "extension" and parts[1] in self.extensions:
+            sensor_id, reading = parts[1], parts[2]
+            index = list(self.extensions).index(sensor_id)
+            if reading == "temperature":
+                return _format(self._temperature(index))
+            if reading == "humidity":
+                return _format(self._humidity(index))
+            if reading == "vpd":
+                temperature = self._temperature(index)
+                saturation = 0.6108 * math.exp(17.27 * temperature / (temperature + 237.3))
+                return _format(saturation * (1 - self._humidity(index) / 100))
+            if reading == "co2-concentration" and self.extensions[sensor_id]:
+                return _format(800.0 + index * 50 + self._drift(1200, 150.0, 3.0, index))
+        return f'error::unknown-parameter "{key}"'
+
+    def _write(self, key, raw):
+        if key == "system:reboot":
+            return "1"
+        if key not in self.settings:
+            return f'error::read-only-or-unknown "{key}"'
+        try:
+            self.settings[key] = _parse_value(self.settings[key], raw)
+        except ValueError:
+            return f'error::invalid-value "{raw}"'
+        self.stats["writes"] += 1
+        return _format(self.settings[key])
+
+    def execute(self, query):
+        """Answer a `;`-separated query the way the controller does."""
+        answers = []
+        for part in query.split(";"):
+            self.stats["keys"] += 1
+            if "=" in part:
+                key, raw = part.split("=", 1)
+                answers.append(self._write(key, raw))
+            else:
+                answers.append(self._read(part))
+        return ";".join(answers)
+
+    async def _handle_command(self, request):
+        self.stats["requests"] += 1
+        self.stats["connections"].add(id(request.transport))
+
+        if self.max_uri_length is not None and len(request.raw_path) > self.max_uri_length:
+            self.stats["rejected"] += 1
+            return web.Response(status=414, text="error::uri-too-long", content_type="text/plain")
+
+        if self._in_flight >= self.max_concurrent_requests:
+            self.stats["rejected"] += 1
+            return web.Response(status=503, text="error::busy", content_type="text/plain")
+
+        self._in_flight += 1
+        self.stats["peak_concurrency"] = max(self.stats["peak_concurrency"], self._in_flight)
+        try:
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            body = self.execute(request.query.get("query", ""))
+        finally:
+            self._in_flight -= 1
+
+        if self.max_response_size is not None and len(body) > self.max_response_size:
+            self.stats["rejected"] += 1
+            return web.Response(status=500, text="error::response-too-large", content_type="text/plain")
+
+        self.stats["bytes_sent"] += len(body)
+        return web.Response(text=body, content_type="text/plain")
+
+    @property
+    def address(self):
+        """host:port to hand to CresControl."""
+        return f"{self.host}:{self.port}"
+
+    def _create_protocol(self):
+        return _CountedProtocol(self, self._runner.server())
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/command", self._handle_command)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        # Served without web.TCPSite so connections can be counted and refused
+        self._server = await asyncio.get_running_loop().create_server(
+            self._create_protocol, self.host, self.port
+        )
+        if self.port == 0:
+            self.port = self._server.sockets[0].getsockname()[1]
+        _LOGGER.info(f"CresControl-Simulator läuft auf {self.address}")
+        return self.address
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def _serve(args):
+    simulator = CresSimulator(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        max_concurrent_requests=args.max_concurrent_requests,
+        max_connections=args.max_connections,
+        max_response_size=args.max_response_size,
+        max_uri_length=args.max_uri_length,
+    )
+    await simulator.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await simulator.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a CresControl on the local machine.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.02, help="random extra seconds per request")
+    parser.add_argument("--max-concurrent-requests", type=int, default=4, help="busy (503) beyond this")
+    parser.add_argument("--max-connections", type=int, default=None, help="open TCP connections, more are reset")
+    parser.add_argument("--max-response-size", type=int, default=None)
+    parser.add_argument("--max-uri-length", type=int, default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_serve(args))
+
+
+if __name__ == "__main__":
+    main()